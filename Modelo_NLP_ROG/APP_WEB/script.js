@@ -1,6 +1,15 @@
 // Referencia al contenedor de mensajes del chat
 const chatBox = document.getElementById("chat-box");
 
+// URL base de la API de HealthMed (ruta /preguntar/stream, respuestas por server-sent events).
+// Se toma de window.HEALTHMED_API_BASE o de <meta name="healthmed-api-base">; si no hay ninguna,
+// se usa el despliegue público.
+const API_BASE = (
+  window.HEALTHMED_API_BASE ||
+  document.querySelector('meta[name="healthmed-api-base"]')?.content ||
+  "https://healthmed-api-nlp.onrender.com"
+).replace(/\/+$/, "");
+
 /**
  * Convierte texto en formato Markdown simple (como **negritas**) y saltos de línea (\n) en HTML.
  * @param {string} text - Texto a convertir
@@ -41,9 +50,75 @@ function appendMessage(text, sender = "bot") {
   chatBox.scrollTop = chatBox.scrollHeight;
 }
 
+/**
+ * Renderiza una burbuja de forma incremental conforme llegan fragmentos de texto.
+ * Los repintados se agrupan por frame para no reconstruir el HTML en cada token.
+ * @param {HTMLElement} bubble - Burbuja del bot donde se escribe la respuesta
+ * @returns {{agregar: function(string): void, texto: function(): string, cancelar: function(): void}}
+ */
+function crearRenderizadorIncremental(bubble) {
+  let texto = "";
+  let pendiente = null; // id del requestAnimationFrame programado, si hay uno
+
+  function pintar() {
+    pendiente = null;
+    bubble.innerHTML = parseMarkdown(texto);
+    chatBox.scrollTop = chatBox.scrollHeight;
+  }
+
+  return {
+    agregar(fragmento) {
+      texto += fragmento;
+      if (pendiente === null) {
+        pendiente = requestAnimationFrame(pintar);
+      }
+    },
+    texto: () => texto,
+    // Descarta el repintado pendiente para que no pise lo que se escriba después en la burbuja
+    cancelar() {
+      if (pendiente !== null) {
+        cancelAnimationFrame(pendiente);
+        pendiente = null;
+      }
+    }
+  };
+}
+
+/**
+ * Lee un stream de server-sent events y llama a onEvento(tipo, datos) por cada evento completo.
+ * @param {ReadableStream} body - Cuerpo de la respuesta de fetch
+ * @param {function(string, object): void} onEvento - Callback por evento
+ */
+async function leerEventos(body, onEvento) {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Los eventos SSE terminan con una línea en blanco
+    let separador;
+    while ((separador = buffer.indexOf("\n\n")) !== -1) {
+      const bloque = buffer.slice(0, separador);
+      buffer = buffer.slice(separador + 2);
+
+      let tipo = "message";
+      let datos = "";
+      for (const linea of bloque.split("\n")) {
+        if (linea.startsWith("event:")) tipo = linea.slice(6).trim();
+        else if (linea.startsWith("data:")) datos += linea.slice(5).trim();
+      }
+      onEvento(tipo, datos ? JSON.parse(datos) : {});
+    }
+  }
+}
+
 /**
  * Función principal que se ejecuta cuando el usuario hace una pregunta.
- * Envía la pregunta a la API y muestra la respuesta.
+ * Envía la pregunta a la API y muestra la respuesta token por token mientras se genera.
  */
 async function consultarAPI() {
   const input = document.getElementById("pregunta");
@@ -54,29 +129,32 @@ async function consultarAPI() {
   appendMessage(pregunta, "user");
   input.value = ""; // Limpia el campo de entrada
 
-  // Muestra un mensaje temporal mientras se consulta la API
+  // Muestra un mensaje temporal mientras llega el primer fragmento
   appendMessage("Escribiendo respuesta...", "bot");
+  const allMessages = document.querySelectorAll(".bot .bubble");
+  const lastBubble = allMessages[allMessages.length - 1];
+  const renderizador = crearRenderizadorIncremental(lastBubble);
 
   try {
-    // Envío de la solicitud POST a la API con la pregunta
-    const res = await fetch("https://healthmed-api-nlp.onrender.com/preguntar", {
+    // Envío de la solicitud POST; la respuesta llega como server-sent events
+    const res = await fetch(`${API_BASE}/preguntar/stream`, {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: { "Content-Type": "application/json", "Accept": "text/event-stream" },
       body: JSON.stringify({ pregunta }) // Enviar pregunta como JSON
     });
+    if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
 
-    // Procesa la respuesta de la API
-    const data = await res.json();
+    // Cada evento "message" trae un fragmento de la respuesta que se pinta de inmediato
+    await leerEventos(res.body, (tipo, datos) => {
+      if (tipo === "message") renderizador.agregar(datos.token);
+      else if (tipo === "error") throw new Error(datos.detail);
+    });
 
-    // Reemplaza el mensaje temporal con la respuesta formateada
-    const allMessages = document.querySelectorAll(".bot .bubble");
-    const lastBubble = allMessages[allMessages.length - 1];
-    lastBubble.innerHTML = parseMarkdown(data.respuesta);
+    if (!renderizador.texto()) throw new Error("Respuesta vacía");
 
   } catch (error) {
-    // En caso de error, reemplaza con mensaje de error
-    const allMessages = document.querySelectorAll(".bot .bubble");
-    const lastBubble = allMessages[allMessages.length - 1];
+    // En caso de error, reemplaza con mensaje de error (sin que un frame pendiente lo sobrescriba)
+    renderizador.cancelar();
     lastBubble.textContent = "Error al consultar la API 😢";
   }
 }
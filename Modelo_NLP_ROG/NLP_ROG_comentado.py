@@ -17,6 +17,13 @@ from langchain.chains.combine_documents import create_stuff_documents_chain
 # Importamos os en caso de usar variables de entorno como la API Key (no se requiere en este ejemplo)
 import os
 
+# Importamos time para medir cuánto tarda cada respuesta (caché vs. LLM)
+import time
+
+# Importamos el caché semántico de la API, que evita repetir llamadas al LLM para preguntas ya respondidas.
+# Se ejecuta con src/HealthMedApi en PYTHONPATH (ver README)
+from src.cache_semantico import CacheSemantico
+
 # ====================================
 # CONTEXTO DEL GLOSARIO (solo texto)
 # ====================================
@@ -272,14 +279,41 @@ llm = ChatOpenAI(model="gpt-4o-mini")
 
 chain = create_stuff_documents_chain(llm=llm, prompt=prompt)
 
+# ==========================================
+# CACHÉ SEMÁNTICO DE RESPUESTAS
+# ==========================================
+# Guarda hasta 256 respuestas durante una hora; preguntas casi idénticas (similitud >= 0.92)
+# reutilizan la respuesta guardada en lugar de volver a llamar al modelo
+cache_respuestas = CacheSemantico(max_entradas=256, ttl=3600, umbral=0.92)
+
+
+def responder(pregunta, contexto=document_chunks):
+    """Responde una pregunta consultando primero el caché y, si no hay acierto, el LLM."""
+    # Si la pregunta (o una casi igual) ya se respondió con este mismo contexto, se reutiliza
+    respuesta = cache_respuestas.obtener(pregunta, contexto)
+    if respuesta is not None:
+        return respuesta
+    # Si no, se invoca la cadena y se guarda el resultado para las siguientes veces
+    respuesta = chain.invoke({"input": pregunta, "context": contexto})
+    cache_respuestas.guardar(pregunta, contexto, respuesta)
+    return respuesta
+
+
 # ==========================================
 # CONSULTA DE USUARIO Y RESPUESTA DEL LLM
 # ==========================================
-# Se simula una pregunta médica típica que el paciente podría hacer sobre su diagnóstico
-respuesta = chain.invoke({
-    "input": "¿Puedo dejar de tomar medicamento si ya me siento bien?",
-    "context": document_chunks
-})
-
-# Se imprime en pantalla la respuesta generada por el modelo, basada en el contexto médico proporcionado
-print(respuesta)
+# Sólo se ejecuta al correr el script directamente; importarlo no llama al modelo
+if __name__ == "__main__":
+    # Se simula una pregunta médica típica que el paciente podría hacer sobre su diagnóstico
+    respuesta = responder("¿Puedo dejar de tomar medicamento si ya me siento bien?")
+
+    # Se imprime en pantalla la respuesta generada por el modelo, basada en el contexto médico proporcionado
+    print(respuesta)
+
+    # La misma pregunta escrita de otra forma se responde desde el caché, sin volver al LLM
+    inicio = time.perf_counter()
+    respuesta = responder("puedo dejar de tomar el medicamento si ya me siento bien")
+    print(f"Respuesta desde caché en {(time.perf_counter() - inicio) * 1000:.2f} ms")
+
+    # Métricas del caché: aciertos exactos, similares, fallos y tasa de aciertos
+    print(cache_respuestas.metricas())
@@ -0,0 +1,236 @@
+import asyncio
+import ipaddress
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src import chatbot
+
+logger = logging.getLogger(__name__)
+
+# ===========================
+# Configuración
+# ===========================
+# Peticiones por segundo y ráfaga máxima por cliente; una tasa de 0 desactiva el límite
+TASA_POR_CLIENTE = float(os.getenv("HEALTHMED_LIMITE_TASA", "10"))
+RAFAGA_POR_CLIENTE = float(os.getenv("HEALTHMED_LIMITE_RAFAGA", "20"))
+# Sesiones vivas como máximo en el proceso; 0 sin límite
+MAX_SESIONES = int(os.getenv("HEALTHMED_MAX_SESIONES", "10000"))
+# Retraso del event loop (ms) a partir del cual se rechazan peticiones nuevas; 0 lo desactiva
+MAX_LAG_MS = float(os.getenv("HEALTHMED_MAX_LAG_MS", "250"))
+INTERVALO_LAG = 0.1
+# "memoria" (por proceso) o "redis" (compartido entre workers, con HEALTHMED_REDIS_URL)
+BACKEND_LIMITES = os.getenv("HEALTHMED_LIMITE_BACKEND", "memoria")
+REDIS_URL = os.getenv("HEALTHMED_REDIS_URL", "redis://localhost:6379/0")
+# IPs o redes (separadas por coma) de los proxies en los que se confía para leer X-Forwarded-For
+PROXIES_CONFIABLES = [ipaddress.ip_network(p.strip(), strict=False)
+                      for p in os.getenv("HEALTHMED_PROXIES_CONFIABLES", "").split(",") if p.strip()]
+
+# Rutas que nunca se limitan (health checks y documentación); los preflight OPTIONS tampoco
+RUTAS_EXENTAS = {"/", "/healthz", "/readyz", "/docs", "/redoc", "/openapi.json"}
+
+# ===========================
+# Backends del token bucket
+# ===========================
+class BackendMemoria:
+    """Token buckets en un diccionario del proceso: clave -> (tokens, instante de la última recarga).
+
+    El diccionario va ordenado por último uso; al llenarse se descarta el cliente que lleva más
+    tiempo sin pedir nada, que es el que tiene más probabilidades de tener la cubeta llena.
+    """
+
+    def __init__(self, max_clientes: int = 100_000):
+        self.max_clientes = max_clientes
+        self._cubetas: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def consumir(self, clave: str, tasa: float, rafaga: float) -> float:
+        """Consume un token. Devuelve 0 si se permitió, o los segundos a esperar si no."""
+        ahora = time.monotonic()
+        estado = self._cubetas.get(clave)
+        if estado is None:
+            if len(self._cubetas) >= self.max_clientes:
+                self._cubetas.popitem(last=False)
+            tokens, ultimo = rafaga, ahora
+        else:
+            self._cubetas.move_to_end(clave)
+            tokens, ultimo = estado
+        tokens = min(rafaga, tokens + (ahora - ultimo) * tasa)
+        if tokens < 1:
+            self._cubetas[clave] = (tokens, ahora)
+            return (1 - tokens) / tasa
+        self._cubetas[clave] = (tokens - 1, ahora)
+        return 0.0
+
+
+# Recarga y consumo atómicos en Redis; devuelve los milisegundos a esperar (0 si se permitió)
+_SCRIPT_REDIS = """
+local tasa = tonumber(ARGV[1])
+local rafaga = tonumber(ARGV[2])
+local ahora = tonumber(ARGV[3])
+local estado = redis.call('HMGET', KEYS[1], 'tokens', 'ultimo')
+local tokens = tonumber(estado[1]) or rafaga
+local ultimo = tonumber(estado[2]) or ahora
+tokens = math.min(rafaga, tokens + math.max(0, ahora - ultimo) * tasa)
+local espera = 0
+if tokens < 1 then
+    espera = math.ceil((1 - tokens) / tasa * 1000)
+else
+    tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ultimo', ahora)
+redis.call('PEXPIRE', KEYS[1], math.ceil(rafaga / tasa * 1000))
+return espera
+"""
+
+
+class BackendRedis:
+    """Token buckets compartidos entre workers. El cliente de Redis se crea en el primer uso."""
+
+    def __init__(self, url: str = REDIS_URL, prefijo: str = "healthmed:limite:"):
+        self.url = url
+        self.prefijo = prefijo
+        self._script = None
+
+    async def consumir(self, clave: str, tasa: float, rafaga: float) -> float:
+        if self._script is None:
+            # Importación diferida: redis sólo es necesario si se usa este backend
+            import redis.asyncio as redis
+
+            self._script = redis.from_url(self.url).register_script(_SCRIPT_REDIS)
+        espera_ms = await self._script(keys=[self.prefijo + clave], args=[tasa, rafaga, time.time()])
+        return int(espera_ms) / 1000
+
+
+BACKENDS = {
+    "memoria": BackendMemoria,
+    "redis": BackendRedis,
+}
+
+# ===========================
+# Retraso del event loop
+# ===========================
+class MonitorLag:
+    """Mide cuánto se atrasa un sleep corto: si el loop está saturado, el retraso crece."""
+
+    def __init__(self, intervalo: float = INTERVALO_LAG):
+        self.intervalo = intervalo
+        self.lag_ms = 0.0
+
+    async def medir(self):
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(self.intervalo)
+            retraso = (time.perf_counter() - inicio - self.intervalo) * 1000
+            # Media móvil: un pico aislado no basta para empezar a rechazar
+            self.lag_ms = 0.7 * self.lag_ms + 0.3 * max(0.0, retraso)
+
+
+monitor_lag = MonitorLag()
+
+# Peticiones rechazadas por motivo, para métricas
+rechazos = {"tasa": 0, "carga": 0, "sesiones": 0}
+
+# ===========================
+# Middleware de admisión
+# ===========================
+def _es_proxy_confiable(ip: str, proxies: List) -> bool:
+    try:
+        direccion = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(direccion in red for red in proxies)
+
+
+def ip_cliente(scope: Scope, proxies: List = PROXIES_CONFIABLES) -> Optional[str]:
+    """IP del cliente. Si la conexión viene de un proxy confiable se toma de X-Forwarded-For,
+    recorriéndolo de derecha a izquierda hasta la primera IP que no sea de un proxy confiable;
+    si no, se ignora el header, que cualquiera puede falsificar."""
+    cliente = scope.get("client")
+    ip = cliente[0] if cliente else None
+    if ip is None or not proxies or not _es_proxy_confiable(ip, proxies):
+        return ip
+    reenviado = Headers(scope=scope).get("X-Forwarded-For", "")
+    for salto in reversed([s.strip() for s in reenviado.split(",") if s.strip()]):
+        ip = salto
+        if not _es_proxy_confiable(salto, proxies):
+            break
+    return ip
+
+
+def clave_cliente(scope: Scope) -> str:
+    """Identifica al cliente por su X-API-Key o, si no la envía, por su IP."""
+    api_key = Headers(scope=scope).get("X-API-Key")
+    if api_key:
+        return "key:" + api_key
+    return "ip:" + (ip_cliente(scope) or "desconocido")
+
+
+async def _rechazar(send: Send, status: int, detalle: str, reintentar: float):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"retry-after", str(max(1, math.ceil(reintentar))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": orjson.dumps({"detail": detalle})})
+
+
+class AdmisionMiddleware:
+    """Rechaza con 503 si el event loop va atrasado y con 429 si el cliente excede su tasa."""
+
+    def __init__(self, app: ASGIApp, tasa: float = TASA_POR_CLIENTE, rafaga: float = RAFAGA_POR_CLIENTE,
+                 max_lag_ms: float = MAX_LAG_MS, backend=None, monitor: Optional[MonitorLag] = None,
+                 exentas: List[str] = RUTAS_EXENTAS) -> None:
+        self.app = app
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self.max_lag_ms = max_lag_ms
+        self.monitor = monitor if monitor is not None else monitor_lag
+        self.exentas = set(exentas)
+        if backend is None:
+            if BACKEND_LIMITES not in BACKENDS:
+                raise ValueError(f"Backend de límites desconocido: {BACKEND_LIMITES}")
+            backend = BACKENDS[BACKEND_LIMITES]()
+        self.backend = backend
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in self.exentas:
+            await self.app(scope, receive, send)
+            return
+
+        if self.max_lag_ms and self.monitor.lag_ms > self.max_lag_ms:
+            rechazos["carga"] += 1
+            await _rechazar(send, 503, "Servidor saturado, intente de nuevo", self.monitor.lag_ms / 1000)
+            return
+
+        if self.tasa:
+            try:
+                espera = await self.backend.consumir(clave_cliente(scope), self.tasa, self.rafaga)
+            except Exception:
+                # Si el backend compartido falla, se deja pasar antes que tumbar la API
+                logger.exception("No se pudo consultar el límite de peticiones")
+                espera = 0.0
+            if espera:
+                rechazos["tasa"] += 1
+                await _rechazar(send, 429, "Demasiadas peticiones", espera)
+                return
+
+        await self.app(scope, receive, send)
+
+
+async def verificar_cupo_sesiones():
+    """Dependencia de /iniciar-diagnostico/: 429 si ya hay MAX_SESIONES sesiones vivas."""
+    if MAX_SESIONES and len(chatbot.sesiones) >= MAX_SESIONES:
+        rechazos["sesiones"] += 1
+        raise HTTPException(status_code=429, detail="Límite de sesiones activas alcanzado",
+                            headers={"Retry-After": "30"})
@@ -0,0 +1,224 @@
+"""Árbol de preguntas precompilado.
+
+Para una apertura (género + síntomas iniciales), la secuencia de preguntas de `siguiente_pregunta`
+depende sólo de las respuestas sí/no. Este módulo expande esa política offline en un árbol,
+lo guarda en arreglos y permite a la API leer la siguiente pregunta en O(1). Un camino que sale
+del árbol (profundidad máxima, rama poco frecuente o respuesta a otro síntoma) vuelve al cálculo en vivo.
+
+Uso (desde src/HealthMedApi):
+    python -m src.arbol --aperturas 60 --profundidad 12
+"""
+import argparse
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src import chatbot
+from src.chatbot import Catalogo, DatosUsuario, RespuestaSintoma, SesionChat, copiar_sesion
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent / "data"
+ARBOL_PATH = DATA_DIR / "arbol_preguntas.npz"
+
+# Códigos de `pregunta` para los nodos en los que _siguiente_pregunta termina con un mensaje
+CONFIABLE = -2
+SIN_PREGUNTAS = -3
+NO_EXPANDIDO = -1  # en `si`/`no`: la rama no se compiló
+
+# Datos de usuario con los que se simula cada género (edad e IMC no cambian las preguntas)
+_DATOS_SIMULACION = {
+    'M': DatosUsuario(edad=30, genero='M', peso=70, altura=1.7, sintomas=[]),
+    'F': DatosUsuario(edad=30, genero='F', peso=60, altura=1.6, sintomas=[]),
+}
+
+# ===========================
+# Árbol en arreglos
+# ===========================
+class ArbolPreguntas:
+    """Nodos en arreglos paralelos; las raíces se buscan por (género, columnas iniciales ordenadas)."""
+
+    MENSAJES_FINALES = {
+        CONFIABLE: "Diagnóstico confiable encontrado",
+        SIN_PREGUNTAS: "No hay más preguntas relevantes",
+    }
+
+    def __init__(self, version: str, pregunta: np.ndarray, si: np.ndarray, no: np.ndarray,
+                 relevante: np.ndarray, fase: np.ndarray, raices: Dict[Tuple[str, Tuple[int, ...]], int]):
+        self.version = version
+        self.pregunta = pregunta    # columna del síntoma a preguntar, o un código final (< 0)
+        self.si = si                # hijo si la respuesta es sí (NO_EXPANDIDO si no se compiló)
+        self.no = no
+        self.relevante = relevante
+        self.fase = fase            # fase de la sesión después de calcular la pregunta
+        self.raices = raices
+
+    def __len__(self):
+        return len(self.pregunta)
+
+    def raiz(self, genero: str, columnas: Iterable[int]) -> Optional[int]:
+        return self.raices.get((genero, tuple(sorted(columnas))))
+
+    def hijo(self, nodo: int, columna: Optional[int], respuesta: bool) -> Optional[int]:
+        """Nodo siguiente si `columna` es la pregunta del nodo; None si el camino sale del árbol."""
+        if columna is None or self.pregunta[nodo] != columna:
+            return None
+        siguiente = int((self.si if respuesta else self.no)[nodo])
+        return None if siguiente == NO_EXPANDIDO else siguiente
+
+
+def guardar_arbol(arbol: ArbolPreguntas, path) -> Path:
+    raices = sorted(arbol.raices.items())
+    columnas = [cols for (_, cols), _ in raices]
+    indptr = np.zeros(len(raices) + 1, dtype=np.int64)
+    np.cumsum([len(c) for c in columnas], out=indptr[1:])
+    np.savez_compressed(
+        path,
+        version=np.array(arbol.version),
+        pregunta=arbol.pregunta, si=arbol.si, no=arbol.no,
+        relevante=arbol.relevante, fase=arbol.fase,
+        raiz_genero=np.array([g for (g, _), _ in raices], dtype='U1'),
+        raiz_indptr=indptr,
+        raiz_columnas=np.array([j for c in columnas for j in c], dtype=np.int32),
+        raiz_nodo=np.array([n for _, n in raices], dtype=np.int32),
+    )
+    return Path(path)
+
+
+def leer_arbol(path) -> ArbolPreguntas:
+    with np.load(path, allow_pickle=False) as datos:
+        indptr = datos['raiz_indptr']
+        columnas = datos['raiz_columnas'].tolist()
+        raices = {
+            (g, tuple(columnas[indptr[i]:indptr[i + 1]])): int(n)
+            for i, (g, n) in enumerate(zip(datos['raiz_genero'].tolist(), datos['raiz_nodo']))
+        }
+        return ArbolPreguntas(str(datos['version']), datos['pregunta'], datos['si'], datos['no'],
+                              datos['relevante'], datos['fase'], raices)
+
+
+def cargar_arbol(path=ARBOL_PATH) -> Optional[ArbolPreguntas]:
+    """Publica el árbol en chatbot.arbol_preguntas si existe y fue compilado para el catálogo vigente."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    arbol = leer_arbol(path)
+    if arbol.version != chatbot.catalogo.version:
+        logger.warning("Árbol de preguntas %s compilado para otra versión del dataset (%s); se ignora",
+                       path, arbol.version)
+        return None
+    chatbot.arbol_preguntas = arbol
+    logger.info("Árbol de preguntas cargado: %d nodos, %d aperturas", len(arbol), len(arbol.raices))
+    return arbol
+
+# ===========================
+# Compilador
+# ===========================
+def aperturas_frecuentes(cat: Catalogo, n: int) -> List[List[int]]:
+    """Los `n` síntomas presentes en más enfermedades, cada uno como apertura de un solo síntoma."""
+    conteo = np.diff(cat.matriz.col_indptr)
+    return [[int(j)] for j in np.argsort(-conteo, kind='stable')[:n] if conteo[j] > 0]
+
+
+def compilar_arbol(cat: Catalogo, aperturas: List[List[int]], profundidad: int = 12,
+                   min_pacientes: int = 2) -> ArbolPreguntas:
+    """Expande la política de preguntas para cada apertura y género.
+
+    Se simula un paciente por enfermedad compatible con la apertura, que responde según sus
+    síntomas; una rama se compila sólo si la recorren al menos `min_pacientes` de ellos.
+    """
+    matriz = cat.matriz
+    pregunta, si, no, relevante, fase = [], [], [], [], []
+    raices = {}
+
+    def expandir(sesion: SesionChat, pacientes: np.ndarray, nivel: int) -> int:
+        nodo = len(pregunta)
+        pregunta.append(0)
+        si.append(NO_EXPANDIDO)
+        no.append(NO_EXPANDIDO)
+        relevante.append(True)
+        fase.append(1)
+        try:
+            p = chatbot._siguiente_pregunta(sesion)
+        except ValueError as e:
+            codigo = {m: c for c, m in ArbolPreguntas.MENSAJES_FINALES.items()}[str(e)]
+            pregunta[nodo], fase[nodo] = codigo, sesion.fase
+            return nodo
+        j = cat.indice_sintoma[p.sintoma]
+        pregunta[nodo], relevante[nodo], fase[nodo] = j, p.es_relevante, sesion.fase
+        if nivel >= profundidad:
+            return nodo
+
+        con_sintoma = np.isin(pacientes, matriz.columna(j))
+        for respuesta, hijos in ((True, si), (False, no)):
+            rama = pacientes[con_sintoma == respuesta]
+            if len(rama) < min_pacientes:
+                continue
+            hijo = copiar_sesion(sesion)
+            chatbot._registrar_respuesta(hijo, RespuestaSintoma(sintoma=p.sintoma, respuesta=respuesta))
+            hijos[nodo] = expandir(hijo, rama, nivel + 1)
+        return nodo
+
+    for genero, datos in _DATOS_SIMULACION.items():
+        particion = cat.particiones[chatbot.perfil(datos)]
+        bloqueados = np.unpackbits(particion.bits_sintomas_excluidos, count=matriz.forma[1]).astype(bool)
+        for columnas in aperturas:
+            columnas = sorted(set(j for j in columnas if not bloqueados[j]))
+            if not columnas or (genero, tuple(columnas)) in raices:
+                continue
+            # Pacientes simulados: enfermedades del género con todos los síntomas de la apertura
+            pacientes = np.flatnonzero((matriz.coincidencias(columnas) == len(columnas)) & ~particion.excluidas)
+            if len(pacientes) < min_pacientes:
+                continue
+            sintomas = [cat.symptom_cols[j] for j in columnas]
+            sesion = chatbot.nueva_sesion("compilacion", datos, sintomas, cat)
+            sesion._nodo_arbol = sesion._arbol = None
+            raices[(genero, tuple(columnas))] = expandir(sesion, pacientes, 0)
+
+    return ArbolPreguntas(
+        version=cat.version,
+        pregunta=np.array(pregunta, dtype=np.int32),
+        si=np.array(si, dtype=np.int32),
+        no=np.array(no, dtype=np.int32),
+        relevante=np.array(relevante, dtype=bool),
+        fase=np.array(fase, dtype=np.int8),
+        raices=raices,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compila el árbol de preguntas para el dataset actual.")
+    parser.add_argument("--dataset", type=Path, default=None,
+                        help="Dataset (.npz o .csv); por defecto el mismo que usa la API")
+    parser.add_argument("--salida", type=Path, default=ARBOL_PATH)
+    parser.add_argument("--aperturas", type=int, default=60,
+                        help="Cantidad de síntomas más frecuentes a usar como apertura")
+    parser.add_argument("--archivo-aperturas", type=Path, default=None,
+                        help="Aperturas adicionales, una por línea con los síntomas separados por comas")
+    parser.add_argument("--profundidad", type=int, default=12)
+    parser.add_argument("--min-pacientes", type=int, default=2)
+    args = parser.parse_args()
+
+    dataset = args.dataset
+    if dataset is None:
+        binario = DATA_DIR / "Dataset_Enfermedades_Final.npz"
+        dataset = binario if binario.exists() else DATA_DIR / "Dataset_Enfermedades_Final.csv"
+    cat = chatbot.cargar_dataset(dataset)
+
+    aperturas = aperturas_frecuentes(cat, args.aperturas)
+    if args.archivo_aperturas:
+        for linea in args.archivo_aperturas.read_text(encoding="utf-8").splitlines():
+            validos, _ = chatbot.encontrar_sintomas_validos([s.strip().lower() for s in linea.split(",") if s.strip()], cat=cat)
+            if validos:
+                aperturas.append([cat.indice_sintoma[s] for s in validos])
+
+    arbol = compilar_arbol(cat, aperturas, args.profundidad, args.min_pacientes)
+    guardar_arbol(arbol, args.salida)
+    print(f"Árbol guardado en {args.salida}: {len(arbol)} nodos, {len(arbol.raices)} aperturas "
+          f"(dataset {cat.version})")
+
+
+if __name__ == "__main__":
+    main()
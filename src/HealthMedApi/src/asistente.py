@@ -0,0 +1,176 @@
+import asyncio
+import os
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
+
+from pydantic import BaseModel
+
+from src.cache_semantico import CacheSemantico
+
+# ===========================
+# CLASES Pydantic para validacion
+# ===========================
+class PreguntaAsistente(BaseModel):
+    pregunta: str
+
+class RespuestaAsistente(BaseModel):
+    respuesta: str
+    desde_cache: bool = False
+
+# ===========================
+# Configuración
+# ===========================
+GLOSARIO_PATH = Path(__file__).parent / "data" / "glosario_hipertension.md"
+
+PROMPT_ASISTENTE = """
+Eres un asistente médico especializado en hipertensión. Responde de forma clara, confiable y breve,
+utilizando el contexto proporcionado. Si una pregunta no está relacionada con la hipertensión,
+indícalo amablemente. Si el usuario plantea temas sensibles fuera del ámbito médico, responde con cortesía y evita abordarlos.
+
+Contexto:
+{context}
+
+Pregunta:
+{input}
+"""
+
+MODELO_OPENAI = os.getenv("HEALTHMED_LLM_MODELO", "gpt-4o-mini")
+BACKEND_POR_DEFECTO = os.getenv("HEALTHMED_LLM_BACKEND", "openai")
+MAX_LLAMADAS_CONCURRENTES = int(os.getenv("HEALTHMED_LLM_CONCURRENCIA", "4"))
+
+# ===========================
+# Backends del modelo
+# ===========================
+class BackendOpenAI:
+    """Cadena LangChain + ChatOpenAI. Se construye en la primera llamada, no al importar."""
+
+    def __init__(self, modelo: str = MODELO_OPENAI):
+        self.modelo = modelo
+        self._chain = None
+
+    def _construir(self):
+        # Importaciones diferidas: LangChain sólo es necesario si se usa este backend
+        from langchain_openai import ChatOpenAI
+        from langchain_core.prompts import ChatPromptTemplate
+        from langchain.chains.combine_documents import create_stuff_documents_chain
+
+        llm = ChatOpenAI(model=self.modelo)
+        prompt = ChatPromptTemplate.from_template(PROMPT_ASISTENTE)
+        return create_stuff_documents_chain(llm=llm, prompt=prompt)
+
+    async def responder(self, pregunta: str, contexto: List[str]) -> str:
+        from langchain_core.documents import Document
+
+        if self._chain is None:
+            self._chain = self._construir()
+        documentos = [Document(page_content=c) for c in contexto]
+        return await self._chain.ainvoke({"input": pregunta, "context": documentos})
+
+    async def responder_stream(self, pregunta: str, contexto: List[str]) -> AsyncIterator[str]:
+        from langchain_core.documents import Document
+
+        if self._chain is None:
+            self._chain = self._construir()
+        documentos = [Document(page_content=c) for c in contexto]
+        async for fragmento in self._chain.astream({"input": pregunta, "context": documentos}):
+            if fragmento:
+                yield fragmento
+
+
+class BackendStub:
+    """Backend local sin red para pruebas: responde con un texto fijo tras una pausa opcional."""
+
+    def __init__(self, latencia: float = 0.0):
+        self.latencia = latencia
+        self.llamadas = 0
+
+    async def responder(self, pregunta: str, contexto: List[str]) -> str:
+        self.llamadas += 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        return f"Respuesta de prueba a: {pregunta}"
+
+    async def responder_stream(self, pregunta: str, contexto: List[str]) -> AsyncIterator[str]:
+        self.llamadas += 1
+        for i, palabra in enumerate(f"Respuesta de prueba a: {pregunta}".split(" ")):
+            if self.latencia:
+                await asyncio.sleep(self.latencia)
+            yield palabra if i == 0 else " " + palabra
+
+
+BACKENDS = {
+    "openai": BackendOpenAI,
+    "stub": BackendStub,
+}
+
+# ===========================
+# Asistente RAG
+# ===========================
+class Asistente:
+    """Une contexto, caché y backend; limita las llamadas simultáneas al modelo."""
+
+    def __init__(self, backend=None, max_concurrentes: int = MAX_LLAMADAS_CONCURRENTES,
+                 cache: Optional[CacheSemantico] = None):
+        self._backend = backend
+        self._contexto: Optional[List[str]] = None
+        self._semaforo = asyncio.Semaphore(max_concurrentes)
+        self.cache = cache if cache is not None else CacheSemantico()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            if BACKEND_POR_DEFECTO not in BACKENDS:
+                raise ValueError(f"Backend de LLM desconocido: {BACKEND_POR_DEFECTO}")
+            self._backend = BACKENDS[BACKEND_POR_DEFECTO]()
+        return self._backend
+
+    @property
+    def contexto(self) -> List[str]:
+        if self._contexto is None:
+            self._contexto = [GLOSARIO_PATH.read_text(encoding="utf-8")]
+        return self._contexto
+
+    async def preguntar(self, pregunta: str) -> RespuestaAsistente:
+        contexto = self.contexto
+        respuesta = self.cache.obtener(pregunta, contexto)
+        if respuesta is not None:
+            return RespuestaAsistente(respuesta=respuesta, desde_cache=True)
+
+        async with self._semaforo:
+            respuesta = await self.backend.responder(pregunta, contexto)
+        self.cache.guardar(pregunta, contexto, respuesta)
+        return RespuestaAsistente(respuesta=respuesta)
+
+    async def preguntar_stream(self, pregunta: str) -> AsyncIterator[str]:
+        """Entrega la respuesta por fragmentos conforme el modelo los genera.
+
+        Un acierto de caché se entrega como un único fragmento. La respuesta completa se guarda
+        en el caché sólo si el stream terminó sin errores.
+        """
+        contexto = self.contexto
+        respuesta = self.cache.obtener(pregunta, contexto)
+        if respuesta is not None:
+            yield respuesta
+            return
+
+        fragmentos = []
+        async with self._semaforo:
+            async for fragmento in self.backend.responder_stream(pregunta, contexto):
+                fragmentos.append(fragmento)
+                yield fragmento
+        self.cache.guardar(pregunta, contexto, "".join(fragmentos))
+
+
+_asistente: Optional[Asistente] = None
+
+def obtener_asistente() -> Asistente:
+    """Devuelve el asistente del proceso, creándolo en el primer uso."""
+    global _asistente
+    if _asistente is None:
+        _asistente = Asistente()
+    return _asistente
+
+def configurar_asistente(asistente: Optional[Asistente]):
+    """Reemplaza el asistente del proceso (p. ej. con BackendStub en pruebas)."""
+    global _asistente
+    _asistente = asistente
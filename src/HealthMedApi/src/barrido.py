@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+
+from src import chatbot
+from src.chatbot import SesionChat
+
+logger = logging.getLogger(__name__)
+
+# Segundos sin uso tras los que una sesión se elimina; 0 desactiva la expiración
+TTL_SESION = float(os.getenv("HEALTHMED_SESION_TTL_SEGUNDOS", "1800"))
+INTERVALO_BARRIDO = float(os.getenv("HEALTHMED_BARRIDO_SEGUNDOS", "60"))
+# Presupuesto de sesiones en memoria; al excederlo se eliminan las menos usadas. 0 sin límite
+MAX_SESIONES_MEMORIA = int(os.getenv("HEALTHMED_SESIONES_MAX", "0"))
+MAX_MB_SESIONES = float(os.getenv("HEALTHMED_SESIONES_MAX_MB", "0"))
+
+# Sesiones eliminadas por motivo, para métricas
+desalojos = {"ttl": 0, "cantidad": 0, "memoria": 0}
+
+
+def tamano_sesion(sesion: SesionChat) -> int:
+    """Bytes aproximados de lo que es propio de una sesión: sus contenedores y los atributos privados
+    que crecen con ella (historial, bits preguntados, coincidencias y especulación).
+
+    No cuenta el catálogo, la partición ni el árbol, ni los strings que comparte con el catálogo.
+    """
+    propios = [sesion.__dict__, sesion.__pydantic_private__, sesion.sintomas_confirmados,
+               sesion.sintomas_preguntados, sesion.grupos_confirmados, sesion._historial,
+               sesion._preguntados, sesion._ultima_respuesta]
+    if sesion._coincidencias is not None:
+        propios.append(sesion._coincidencias)
+        propios.extend(sesion._coincidencias)
+    if sesion._especulacion is not None:
+        siguientes = sesion._especulacion[3]
+        propios.extend([sesion._especulacion, siguientes])
+        for valor in siguientes.values():
+            propios.extend([valor, valor[0]])
+    return sum(sys.getsizeof(obj) for obj in propios if obj is not None)
+
+
+def barrer_sesiones(ttl: float = TTL_SESION, max_sesiones: int = MAX_SESIONES_MEMORIA,
+                    max_bytes: int = int(MAX_MB_SESIONES * 1024 * 1024)) -> dict:
+    """Elimina las sesiones vencidas y después las menos usadas hasta cumplir el presupuesto.
+
+    `chatbot.sesiones` está ordenado por último uso, así que siempre se recorre desde el principio.
+    """
+    sesiones = chatbot.sesiones
+    eliminadas = {"ttl": 0, "cantidad": 0, "memoria": 0}
+
+    if ttl:
+        limite = time.monotonic() - ttl
+        while sesiones:
+            id_sesion, sesion = next(iter(sesiones.items()))
+            if sesion._ultimo_acceso > limite:
+                break
+            del sesiones[id_sesion]
+            eliminadas["ttl"] += 1
+
+    if max_sesiones:
+        while len(sesiones) > max_sesiones:
+            sesiones.popitem(last=False)
+            eliminadas["cantidad"] += 1
+
+    if max_bytes:
+        tamanos = [tamano_sesion(s) for s in sesiones.values()]
+        total = sum(tamanos)
+        for tamano in tamanos:
+            if total <= max_bytes:
+                break
+            sesiones.popitem(last=False)
+            total -= tamano
+            eliminadas["memoria"] += 1
+
+    for motivo, n in eliminadas.items():
+        desalojos[motivo] += n
+    return eliminadas
+
+
+def estado_sesiones() -> dict:
+    sesiones = list(chatbot.sesiones.values())
+    return {
+        "sesiones": len(sesiones),
+        "bytes_aproximados": sum(tamano_sesion(s) for s in sesiones),
+        "desalojos": dict(desalojos),
+    }
+
+
+async def barrido_periodico(intervalo: float = INTERVALO_BARRIDO):
+    """Ejecuta barrer_sesiones cada `intervalo` segundos en el event loop."""
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            eliminadas = barrer_sesiones()
+        except Exception:
+            logger.exception("Falló el barrido de sesiones")
+            continue
+        if any(eliminadas.values()):
+            logger.info("Sesiones eliminadas: %s (quedan %d)", eliminadas, len(chatbot.sesiones))
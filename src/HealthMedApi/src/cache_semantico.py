@@ -0,0 +1,172 @@
+# Caché de respuestas del asistente RAG. También lo usa el prototipo Modelo_NLP_ROG/NLP_ROG_comentado.py.
+# Una pregunta repetida, o casi idéntica, con el mismo contexto se responde sin volver al LLM.
+
+from collections import OrderedDict
+import hashlib
+import math
+import re
+import threading
+import time
+import unicodedata
+
+
+# ====================================
+# NORMALIZACIÓN Y VECTORES LOCALES
+# ====================================
+def normalizar_pregunta(texto):
+    """Minúsculas, sin acentos, sin signos de puntuación y con espacios simples."""
+    # Se descomponen los caracteres acentuados y se eliminan las marcas diacríticas
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    # Se reemplaza todo lo que no sea letra o número por un espacio
+    texto = re.sub(r"[^a-z0-9ñ]+", " ", texto)
+    return " ".join(texto.split())
+
+
+def huella_contexto(documentos):
+    """Hash estable del contexto recuperado (lista de Document o de textos)."""
+    h = hashlib.sha256()
+    for doc in documentos:
+        # Se acepta tanto un Document de LangChain como un str plano
+        contenido = getattr(doc, "page_content", doc)
+        h.update(contenido.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def vectorizar(texto_normalizado):
+    """Vector disperso de trigramas de caracteres y palabras completas (bolsa de rasgos)."""
+    vector = {}
+    relleno = f" {texto_normalizado} "
+    # Trigramas de caracteres: toleran errores de escritura y variaciones pequeñas
+    for i in range(len(relleno) - 2):
+        rasgo = relleno[i:i + 3]
+        vector[rasgo] = vector.get(rasgo, 0) + 1
+    # Palabras completas con más peso: una palabra distinta ("dejar") cambia el sentido
+    for palabra in texto_normalizado.split():
+        rasgo = "#" + palabra
+        vector[rasgo] = vector.get(rasgo, 0) + 3
+    norma = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {k: v / norma for k, v in vector.items()}
+
+
+# Palabras que no cambian el sentido de una pregunta; "no", "sin", "nunca", los números y todo
+# lo demás se consideran contenido
+PALABRAS_VACIAS = frozenset("""
+a al algo algun alguna alguno ante como con cual cuales de del e el en entre es esta este esto
+la las le les lo los me mi mis o para por que se si su sus te tu tus u un una unas uno unos y ya
+""".split())
+
+
+def firma_contenido(texto_normalizado):
+    """Palabras de contenido de la pregunta (con repeticiones y sin importar el orden).
+
+    Dos preguntas sólo se consideran casi idénticas si tienen la misma firma: así "me siento bien"
+    y "no me siento bien", "hipertensión" e "hipotensión" o "50 mg" y "100 mg" nunca comparten
+    respuesta aunque sus trigramas se parezcan mucho.
+    """
+    return tuple(sorted(p for p in texto_normalizado.split() if p not in PALABRAS_VACIAS))
+
+
+def similitud_coseno(a, b):
+    """Producto punto entre dos vectores ya normalizados."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+# ====================================
+# CACHÉ CON TTL, LÍMITE DE TAMAÑO Y MÉTRICAS
+# ====================================
+class CacheSemantico:
+    """Caché de respuestas indexado por (huella del contexto, pregunta normalizada).
+
+    - Coincidencia exacta: búsqueda directa en el diccionario.
+    - Coincidencia cercana: similitud coseno >= ``umbral`` contra las preguntas guardadas
+      con el mismo contexto y la misma firma de contenido (sólo cambian palabras vacías u orden).
+    - Las entradas caducan tras ``ttl`` segundos y se desalojan por LRU al superar ``max_entradas``.
+    """
+
+    def __init__(self, max_entradas=256, ttl=3600.0, umbral=0.92):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.umbral = umbral
+        # clave -> (respuesta, vector, firma de contenido, instante de creación)
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos_exactos = 0
+        self.aciertos_similares = 0
+        self.fallos = 0
+        self.expirados = 0
+        self.desalojos = 0
+
+    def _vigente(self, clave, creado, ahora):
+        # Elimina la entrada si ya caducó y devuelve si sigue siendo válida
+        if ahora - creado > self.ttl:
+            del self._entradas[clave]
+            self.expirados += 1
+            return False
+        return True
+
+    def obtener(self, pregunta, documentos):
+        """Devuelve la respuesta guardada o None si no hay una suficientemente parecida."""
+        ctx = huella_contexto(documentos)
+        normalizada = normalizar_pregunta(pregunta)
+        clave = (ctx, normalizada)
+        ahora = time.monotonic()
+        with self._lock:
+            # 1) Coincidencia exacta de la pregunta normalizada
+            entrada = self._entradas.get(clave)
+            if entrada is not None and self._vigente(clave, entrada[3], ahora):
+                self._entradas.move_to_end(clave)
+                self.aciertos_exactos += 1
+                return entrada[0]
+
+            # 2) Coincidencia cercana con el mismo contexto y las mismas palabras de contenido
+            vector = vectorizar(normalizada)
+            firma = firma_contenido(normalizada)
+            mejor_clave, mejor_sim = None, self.umbral
+            for otra_clave, (_, otro_vector, otra_firma, creado) in list(self._entradas.items()):
+                if otra_clave[0] != ctx or not self._vigente(otra_clave, creado, ahora):
+                    continue
+                if otra_firma != firma:
+                    continue
+                sim = similitud_coseno(vector, otro_vector)
+                if sim >= mejor_sim:
+                    mejor_clave, mejor_sim = otra_clave, sim
+            if mejor_clave is not None:
+                self._entradas.move_to_end(mejor_clave)
+                self.aciertos_similares += 1
+                return self._entradas[mejor_clave][0]
+
+            self.fallos += 1
+            return None
+
+    def guardar(self, pregunta, documentos, respuesta):
+        """Guarda la respuesta del modelo y desaloja la menos usada si se excede el tamaño."""
+        normalizada = normalizar_pregunta(pregunta)
+        clave = (huella_contexto(documentos), normalizada)
+        with self._lock:
+            self._entradas[clave] = (respuesta, vectorizar(normalizada), firma_contenido(normalizada),
+                                     time.monotonic())
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def metricas(self):
+        """Contadores de uso y tasa de aciertos (exactos + similares)."""
+        consultas = self.aciertos_exactos + self.aciertos_similares + self.fallos
+        return {
+            "entradas": len(self._entradas),
+            "aciertos_exactos": self.aciertos_exactos,
+            "aciertos_similares": self.aciertos_similares,
+            "fallos": self.fallos,
+            "expirados": self.expirados,
+            "desalojos": self.desalojos,
+            "tasa_aciertos": round((self.aciertos_exactos + self.aciertos_similares) / consultas, 3) if consultas else 0.0,
+        }
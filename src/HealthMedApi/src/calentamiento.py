@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import os
+import time
+
+from src import chatbot
+from src.arbol import aperturas_frecuentes
+from src.chatbot import DatosUsuario, RespuestaSintoma
+
+logger = logging.getLogger(__name__)
+
+# Síntomas más frecuentes con los que se simulan sesiones al arrancar; 0 desactiva el calentamiento
+APERTURAS_CALENTAMIENTO = int(os.getenv("HEALTHMED_CALENTAR_APERTURAS", "20"))
+PREGUNTAS_CALENTAMIENTO = int(os.getenv("HEALTHMED_CALENTAR_PREGUNTAS", "10"))
+
+# Un perfil por género; edad e IMC no cambian las preguntas ni el top k
+_PERFILES = (
+    DatosUsuario(edad=30, genero='M', peso=70, altura=1.7, sintomas=[]),
+    DatosUsuario(edad=30, genero='F', peso=60, altura=1.6, sintomas=[]),
+)
+
+# Progreso del calentamiento, para /healthz y /readyz
+estado = {"listo": False, "estado": "pendiente", "version_dataset": None, "sesiones": 0, "segundos": None}
+
+
+def calentar(aperturas: int = APERTURAS_CALENTAMIENTO, preguntas: int = PREGUNTAS_CALENTAMIENTO) -> int:
+    """Recorre sesiones sintéticas con el catálogo vigente y devuelve cuántas simuló.
+
+    Cada sesión pasa por lo mismo que una real (extracción de síntomas, siguiente pregunta,
+    respuesta y diagnóstico, más su serialización), así quedan hechas las asignaciones de la
+    primera llamada y la memoria compartida con las aperturas más comunes. Las sesiones no se
+    registran en `chatbot.sesiones`.
+    """
+    cat = chatbot.catalogo
+    cat.vocabulario.sugerir(cat.symptom_cols[0][:3])
+    n = 0
+    for columnas in aperturas_frecuentes(cat, aperturas):
+        sintomas = [cat.symptom_cols[j].replace('_', ' ') for j in columnas]
+        validos, _ = chatbot.encontrar_sintomas_validos(sintomas, cat=cat)
+        for datos in _PERFILES:
+            sesion = chatbot.nueva_sesion(f"calentamiento-{n}", datos, validos, cat)
+            sesion.model_dump_json()
+            for i in range(preguntas):
+                try:
+                    pregunta = chatbot.calcular_siguiente(sesion)
+                except ValueError:
+                    break
+                pregunta.model_dump_json()
+                # Respuestas variadas para que se llenen ramas distintas de cada apertura
+                respuesta = RespuestaSintoma(sintoma=pregunta.sintoma, respuesta=(i + n) % 3 == 0)
+                chatbot._registrar_respuesta(sesion, respuesta)
+            chatbot._diagnostico(sesion, 3).model_dump_json()
+            n += 1
+    return n
+
+
+async def calentar_en_segundo_plano():
+    """Ejecuta `calentar` en un hilo aparte; /readyz responde 200 cuando termina (aunque falle)."""
+    if not APERTURAS_CALENTAMIENTO:
+        estado.update(listo=True, estado="desactivado", version_dataset=chatbot.catalogo.version)
+        return
+    estado.update(estado="en_curso", version_dataset=chatbot.catalogo.version)
+    inicio = time.monotonic()
+    try:
+        n = await asyncio.to_thread(calentar)
+    except Exception:
+        logger.exception("Falló el calentamiento; se atiende tráfico sin él")
+        estado.update(listo=True, estado="error", segundos=round(time.monotonic() - inicio, 3))
+        return
+    estado.update(listo=True, estado="completo", sesiones=n, segundos=round(time.monotonic() - inicio, 3))
+    logger.info("Calentamiento terminado: %d sesiones en %.2f s", n, estado["segundos"])
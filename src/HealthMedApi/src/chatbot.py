@@ -1,11 +1,21 @@
-from typing import List, Dict, Optional, Union
-from pydantic import BaseModel
-import pandas as pd
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Optional, Set, Tuple, Union
+from pydantic import BaseModel, PrivateAttr, field_serializer
 import numpy as np
+import csv
+import hashlib
+import threading
+import time
 import difflib
 import uuid
 import re
 
+from src.extraccion import ExtractorSintomas, VocabularioSintomas, frases_sintomas, normalizar_texto
+from src.memo import clave_estado, memo
+
 # ===========================
 # CLASES Pydantic para validacion
 # ===========================
@@ -20,20 +30,53 @@ class SintomaPregunta(BaseModel):
     sintoma: str
     grupo: Optional[str] = None
     es_relevante: bool = True
+    secuencia: Optional[int] = None  # valor a enviar en RespuestaSintoma.secuencia
 
 class RespuestaSintoma(BaseModel):
     sintoma: str
     respuesta: bool
+    # Si se envía, debe coincidir con SesionChat.secuencia; evita registrar dos veces un reintento
+    secuencia: Optional[int] = None
 
 class SesionChat(BaseModel):
     id_sesion: str
     datos_usuario: Optional[DatosUsuario] = None
     sintomas_confirmados: Dict[str, int] = {}
-    sintomas_preguntados: List[str] = []
-    grupos_confirmados: List[str] = []
+    # Conjuntos para consultas O(1); en JSON se entregan como listas ordenadas
+    sintomas_preguntados: Set[str] = set()
+    grupos_confirmados: Set[str] = set()
     preguntas_realizadas: int = 0
     preguntas_desde_ultima_confirmacion: int = 0
     fase: int = 1  # 1: Preguntas guiadas, 2: Preguntas adaptativas
+    version_dataset: Optional[str] = None
+    secuencia: int = 0  # respuestas registradas; cambia con cada respuesta aceptada
+    # Catálogo con el que empezó la sesión; una recarga del dataset no lo cambia
+    _catalogo: Optional['Catalogo'] = PrivateAttr(default=None)
+    # Partición demográfica de ese catálogo que le corresponde (ver particion_de)
+    _particion: Optional['Particion'] = PrivateAttr(default=None)
+    # Serializa las operaciones sobre la misma sesión (peticiones concurrentes o en hilos)
+    _lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+    # (sintoma, respuesta) de la última respuesta aceptada, para reconocer reintentos
+    _ultima_respuesta: Optional[Tuple[str, bool]] = PrivateAttr(default=None)
+    # Bits de los síntomas ya preguntados, en columnas del catálogo de la sesión (ver mapa_preguntados)
+    _preguntados: Optional[np.ndarray] = PrivateAttr(default=None)
+    # time.monotonic() del último uso; el barrido de sesiones inactivas se basa en él
+    _ultimo_acceso: float = PrivateAttr(default_factory=time.monotonic)
+    # Nodo del árbol de preguntas precompilado en el que va la sesión; None si salió del árbol
+    _arbol: Optional[object] = PrivateAttr(default=None)
+    _nodo_arbol: Optional[int] = PrivateAttr(default=None)
+    # (bits de los confirmados, coincidencias por enfermedad) calculadas por src.lotes
+    _coincidencias: Optional[Tuple[bytes, np.ndarray]] = PrivateAttr(default=None)
+    # Siguiente pregunta precalculada para cada respuesta posible (ver src.especulacion):
+    # (secuencia en que se calculó, versión del catálogo, síntoma preguntado,
+    #  {respuesta: (pregunta o mensaje final, fase)})
+    _especulacion: Optional[Tuple[int, str, str, Dict[bool, Tuple[Union[SintomaPregunta, str], int]]]] = PrivateAttr(default=None)
+    # Orden de las respuestas a síntomas del catálogo: columna + 1, negativa si la respuesta fue "no"
+    _historial: array = PrivateAttr(default_factory=lambda: array('i'))
+
+    @field_serializer('sintomas_preguntados', 'grupos_confirmados')
+    def _como_lista(self, valores: Set[str]) -> List[str]:
+        return sorted(valores)
 
 class ResultadoDiagnostico(BaseModel):
     enfermedades: List[Dict] = []
@@ -41,11 +84,16 @@ class ResultadoDiagnostico(BaseModel):
     preguntas_realizadas: int = 0
     sintomas_confirmados: int = 0
 
+# Perfiles demográficos con los que se parte el catálogo
+GENEROS = ('M', 'F')
+BANDAS_EDAD = ('niño', 'adolescente', 'adulto', 'adulto_mayor')
+BANDAS_IMC = ('desnutricion', 'normal', 'sobrepeso', 'obesidad')
+
 # Variables globales
-df = None
-symptom_cols = []
-risk_cols = []
-sesiones = {}
+catalogo = None  # Catalogo vigente; cargar_dataset lo reemplaza con una sola asignación
+risk_cols = ['hombre', 'mujer', 'obesidad', 'sobrepeso', 'desnutricion', 'niño', 'adolescente', 'adulto', 'adulto_mayor']
+sesiones = OrderedDict()  # ordenadas de la menos a la más recientemente usada
+arbol_preguntas = None  # ArbolPreguntas (src.arbol) compilado para algún catálogo; opcional
 
 # ===========================
 # Grupos de síntomas y Sinónimos
@@ -169,253 +217,672 @@ sinonimos_personalizados = {
     'visión_doble': 'vision_borrosa',
 }
 
+# ===========================
+# MATRIZ DISPERSA ENFERMEDAD -> SÍNTOMA
+# ===========================
+class MatrizSintomas:
+    """Enlaces enfermedad -> síntoma guardados en CSR (por fila) y CSC (por columna).
+
+    Sólo se almacenan los unos, así que memoria y tiempo de cada consulta crecen con el número
+    de enlaces y no con enfermedades x síntomas. Los índices de cada fila quedan en orden de
+    columna, igual que `symptom_cols`.
+    """
+
+    def __init__(self, densa: np.ndarray):
+        n_filas, n_cols = densa.shape
+        filas, cols = np.nonzero(densa)
+        self.forma = (n_filas, n_cols)
+        # CSR: np.nonzero ya recorre fila por fila
+        self.indptr = np.zeros(n_filas + 1, dtype=np.int64)
+        np.cumsum(np.bincount(filas, minlength=n_filas), out=self.indptr[1:])
+        self.indices = cols.astype(np.int32)
+        # CSC: los mismos enlaces ordenados por columna
+        orden = np.argsort(cols, kind='stable')
+        self.col_indptr = np.zeros(n_cols + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cols, minlength=n_cols), out=self.col_indptr[1:])
+        self.col_indices = filas[orden].astype(np.int32)
+        # Número de síntomas de cada enfermedad (total_e del score)
+        self.totales = np.diff(self.indptr)
+        # Síntomas de cada enfermedad como bits empaquetados (8 síntomas por byte)
+        self.bits = np.packbits(densa, axis=1)
+
+    def fila(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def columna(self, j: int) -> np.ndarray:
+        return self.col_indices[self.col_indptr[j]:self.col_indptr[j + 1]]
+
+    def coincidencias(self, columnas) -> np.ndarray:
+        """Por enfermedad, cuántas de las `columnas` dadas tiene (recorre sólo esas columnas)."""
+        if len(columnas) == 0:
+            return np.zeros(self.forma[0], dtype=np.int64)
+        enlaces = np.concatenate([self.columna(j) for j in columnas])
+        return np.bincount(enlaces, minlength=self.forma[0])
+
+    def frecuencias(self, filas) -> np.ndarray:
+        """Por síntoma, en cuántas de las `filas` dadas aparece."""
+        seleccion = np.zeros(self.forma[0], dtype=bool)
+        seleccion[filas] = True
+        # Se expande la selección de filas a sus enlaces en una sola operación
+        enlaces = self.indices[np.repeat(seleccion, self.totales)]
+        return np.bincount(enlaces, minlength=self.forma[1])
+
+    def mascara(self, columnas) -> np.ndarray:
+        """Bits empaquetados con las `columnas` dadas encendidas."""
+        densa = np.zeros(self.forma[1], dtype=bool)
+        densa[list(columnas)] = True
+        return np.packbits(densa)
+
+    def coincidencias_lote(self, consultas: List[List[int]]) -> np.ndarray:
+        """`coincidencias` de varias consultas a la vez: una fila por consulta, con un solo bincount."""
+        n_filas = self.forma[0]
+        columnas = np.fromiter((j for c in consultas for j in c), dtype=np.int64)
+        consulta = np.repeat(np.arange(len(consultas)), [len(c) for c in consultas])
+        inicios = self.col_indptr[columnas]
+        largos = self.col_indptr[columnas + 1] - inicios
+        # Posición en col_indices de cada enlace de cada columna pedida, sin recorrerlas una por una
+        desplazamiento = np.repeat(inicios - np.cumsum(largos) + largos, largos)
+        enlaces = self.col_indices[desplazamiento + np.arange(largos.sum())]
+        filas = np.repeat(consulta, largos) * n_filas + enlaces
+        return np.bincount(filas, minlength=len(consultas) * n_filas).reshape(len(consultas), n_filas)
+
+    def pendientes(self, filas, bloqueados: np.ndarray) -> np.ndarray:
+        """Por cada fila, sus síntomas que no están en `bloqueados`: un AND-NOT por enfermedad."""
+        return np.unpackbits(self.bits[filas] & ~bloqueados, axis=1, count=self.forma[1]).astype(bool)
+
+def encender_bit(bits: np.ndarray, j: int):
+    bits[j >> 3] |= 0x80 >> (j & 7)
+
+@dataclass(frozen=True)
+class Particion:
+    """Vista del catálogo para un perfil género x edad x IMC. Se arma al cargar el dataset."""
+    genero: str
+    banda_edad: str
+    banda_imc: str
+    excluidas: np.ndarray  # filas de enfermedades que no aplican al género (sólo lectura)
+    bits_sintomas_excluidos: np.ndarray  # síntomas que no se preguntan a este género
+    vector_base: Mapping[str, int]  # síntomas en 0 y factores de riesgo del perfil
+
+@dataclass(frozen=True)
+class Catalogo:
+    """Una versión cargada del dataset. No se modifica: una recarga crea otra instancia."""
+    version: str
+    symptom_cols: List[str]
+    indice_sintoma: Dict[str, int]
+    matriz: MatrizSintomas
+    nombres: np.ndarray
+    descripciones: np.ndarray
+    tratamientos: np.ndarray
+    # Bits de los síntomas de cada grupo exclusivo
+    bits_grupos: Dict[str, np.ndarray]
+    particiones: Dict[Tuple[str, str, str], Particion]
+    # Nombres de síntomas y sinónimos compilados para buscarlos en texto libre y autocompletar
+    extractor: ExtractorSintomas
+    vocabulario: VocabularioSintomas
+
 # ===========================
 # FUNCIONES AUXILIARES
 # ===========================
-def cargar_dataset(path: str):
-    global df, symptom_cols, risk_cols
-    df = pd.read_csv(path, encoding='utf-8', encoding_errors='replace')
-    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
-    for col in df.columns:
-        if col not in ['nombre_de_la_enfermedad', 'breve_descripción', 'tratamiento']:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
-    risk_cols = ['hombre', 'mujer', 'obesidad', 'sobrepeso', 'desnutricion', 'niño', 'adolescente', 'adulto', 'adulto_mayor']
-    symptom_cols = [col for col in df.columns if col not in ['nombre_de_la_enfermedad', 'breve_descripción', 'tratamiento'] + risk_cols]
-
-def encontrar_sintomas_validos(sintomas_usuario, cutoff=0.70):
-    """Encuentra coincidencias entre los síntomas ingresados y los del dataset."""
+COLUMNAS_TEXTO = ['nombre_de_la_enfermedad', 'breve_descripción', 'tratamiento']
+
+def leer_dataset_binario(path: str) -> Tuple[Dict[str, np.ndarray], List[str], np.ndarray]:
+    """Lee el .npz que genera PROCESAMIENTO_DATASET.PY (ya normalizado, sin parsear texto).
+
+    Devuelve las columnas de texto, los nombres de las numéricas y su matriz de enteros.
+    """
+    with np.load(path, allow_pickle=False) as datos:
+        textos = {c: datos['textos'][:, i].astype(object) for i, c in enumerate(datos['columnas_texto'].tolist())}
+        return textos, datos['columnas'].tolist(), datos['matriz'].astype(int)
+
+def a_entero(valor: str) -> int:
+    """Igual que pd.to_numeric(errors='coerce').fillna(0).astype(int) para una celda."""
+    try:
+        numero = float(valor)
+        return 0 if numero != numero else int(numero)
+    except (ValueError, OverflowError):
+        return 0
+
+def leer_dataset_csv(path: str) -> Tuple[Dict[str, np.ndarray], List[str], np.ndarray]:
+    """Lee el CSV con el módulo csv, en el mismo formato que leer_dataset_binario.
+
+    Los nombres de columna se normalizan (minúsculas, '_' en lugar de espacios) y las celdas
+    numéricas vacías o inválidas valen 0. Cada valor distinto se convierte una sola vez.
+    """
+    with open(path, encoding='utf-8', errors='replace', newline='') as f:
+        lector = csv.reader(f)
+        columnas = [c.strip().lower().replace(' ', '_') for c in next(lector)]
+        filas = [fila + [''] * (len(columnas) - len(fila)) for fila in lector if fila]
+
+    textos = {}
+    for j, c in enumerate(columnas):
+        if c in COLUMNAS_TEXTO:
+            textos[c] = np.empty(len(filas), dtype=object)
+            textos[c][:] = [fila[j] for fila in filas]
+    indices = [j for j, c in enumerate(columnas) if c not in COLUMNAS_TEXTO]
+    convertidos = {}
+
+    def entero(valor):
+        resultado = convertidos.get(valor)
+        if resultado is None:
+            resultado = convertidos[valor] = a_entero(valor)
+        return resultado
+
+    valores = np.array([[entero(fila[j]) for j in indices] for fila in filas], dtype=np.int64)
+    return textos, [columnas[j] for j in indices], valores.reshape(len(filas), len(indices))
+
+def construir_catalogo(path: str) -> Catalogo:
+    """Lee el dataset y construye todas sus estructuras sin tocar el catálogo vigente."""
+    if str(path).endswith('.npz'):
+        textos, columnas, valores = leer_dataset_binario(path)
+    else:
+        textos, columnas, valores = leer_dataset_csv(path)
+    posiciones = [j for j, col in enumerate(columnas) if col not in risk_cols]
+    symptom_cols = [columnas[j] for j in posiciones]
+
+    with open(path, 'rb') as f:
+        version = hashlib.sha256(f.read()).hexdigest()[:12]
+
+    indice_sintoma = {s: j for j, s in enumerate(symptom_cols)}
+    matriz = MatrizSintomas(valores[:, posiciones] == 1)
+
+    if 'nombre_de_la_enfermedad' not in textos:
+        raise ValueError(f"El dataset {path} no tiene la columna 'nombre_de_la_enfermedad'")
+    nombres = textos['nombre_de_la_enfermedad']
+    # La descripción y el tratamiento son opcionales: si faltan, quedan vacíos
+    vacios = np.full(len(nombres), '', dtype=object)
+
+    def bits_de(sintomas):
+        return matriz.mascara(indice_sintoma[s] for s in sintomas if s in indice_sintoma)
+
+    frases = frases_sintomas(symptom_cols, sinonimos_personalizados)
+
+    return Catalogo(
+        version=version,
+        symptom_cols=symptom_cols,
+        indice_sintoma=indice_sintoma,
+        matriz=matriz,
+        nombres=nombres,
+        descripciones=textos.get('breve_descripción', vacios),
+        tratamientos=textos.get('tratamiento', vacios),
+        bits_grupos={grupo: bits_de(sintomas) for grupo, sintomas in grupos_exclusivos.items()},
+        particiones=construir_particiones(symptom_cols, nombres, bits_de),
+        extractor=ExtractorSintomas(frases),
+        vocabulario=VocabularioSintomas(frases, version),
+    )
+
+def construir_particiones(symptom_cols: List[str], nombres: np.ndarray, bits_de) -> Dict[Tuple[str, str, str], Particion]:
+    """Una partición por perfil. Los arreglos por género se comparten entre las bandas de edad e IMC."""
+    por_genero = {}
+    for genero in GENEROS:
+        exclusivas = enfermedades_exclusivas_hombre if genero == 'M' else enfermedades_exclusivas_mujer
+        sintomas = sintomas_exclusivos_hombre if genero == 'M' else sintomas_exclusivos_mujer
+        excluidas = np.isin(nombres, list(exclusivas))
+        bits = bits_de(sintomas)
+        excluidas.flags.writeable = False
+        bits.flags.writeable = False
+        por_genero[genero] = (excluidas, bits)
+
+    ceros = {s: 0 for s in symptom_cols + risk_cols}
+    particiones = {}
+    for genero, (excluidas, bits) in por_genero.items():
+        for edad in BANDAS_EDAD:
+            for imc in BANDAS_IMC:
+                vector = dict(ceros)
+                for factor in ('hombre' if genero == 'M' else 'mujer', edad, imc):
+                    if factor in vector:
+                        vector[factor] = 1
+                particiones[(genero, edad, imc)] = Particion(
+                    genero=genero, banda_edad=edad, banda_imc=imc,
+                    excluidas=excluidas, bits_sintomas_excluidos=bits,
+                    vector_base=MappingProxyType(vector),
+                )
+    return particiones
+
+def cargar_dataset(path: str) -> Catalogo:
+    """Construye un catálogo nuevo y lo publica. Las sesiones abiertas conservan el suyo."""
+    global catalogo
+    nuevo = construir_catalogo(path)
+    catalogo = nuevo
+    return nuevo
+
+def perfil(datos: DatosUsuario) -> Tuple[str, str, str]:
+    """(género, banda de edad, banda de IMC) del usuario; las bandas son los factores de riesgo."""
+    genero = 'M' if datos.genero == 'M' else 'F'
+    if datos.edad <= 12:
+        edad = 'niño'
+    elif datos.edad <= 18:
+        edad = 'adolescente'
+    elif datos.edad <= 59:
+        edad = 'adulto'
+    else:
+        edad = 'adulto_mayor'
+    imc = datos.peso / (datos.altura ** 2)
+    if imc < 18.5:
+        banda_imc = 'desnutricion'
+    elif imc < 25:
+        banda_imc = 'normal'  # Peso normal: sin factor de riesgo
+    elif imc < 30:
+        banda_imc = 'sobrepeso'
+    else:
+        banda_imc = 'obesidad'
+    return genero, edad, banda_imc
+
+def particion_de(sesion: 'SesionChat') -> Particion:
+    """Partición del catálogo de la sesión para su perfil; se resuelve una sola vez."""
+    if sesion._particion is None:
+        sesion._particion = catalogo_de(sesion).particiones[perfil(sesion.datos_usuario)]
+    return sesion._particion
+
+def catalogo_de(sesion: 'SesionChat') -> Catalogo:
+    """Catálogo con el que se creó la sesión (o el vigente si no tiene uno asociado)."""
+    if sesion._catalogo is None:
+        sesion._catalogo = catalogo
+        sesion.version_dataset = catalogo.version
+    return sesion._catalogo
+
+def encontrar_sintomas_validos(sintomas_usuario, cutoff=0.70, cat: Optional[Catalogo] = None):
+    """Encuentra coincidencias entre los síntomas ingresados y los del dataset.
+
+    Cada texto puede mencionar varios síntomas ("me duele la cabeza y tengo fiebre"); se buscan
+    todos con el extractor del catálogo. Si encuentra a lo sumo uno y no cubre el texto completo
+    ("sangrado vaginal" -> "sangrado"), se prefiere la columna más parecida al texto con difflib.
+    """
+    cat = cat or catalogo
     sintomas_validos = []
     coincidencias = {}
     
-    # Primero aplicar sinónimos
-    sintomas_mapeados = []
     for s in sintomas_usuario:
-        encontrado = False
-        for clave, valor in sinonimos_personalizados.items():
-            if clave in s:
-                sintomas_mapeados.append(valor)
-                coincidencias[s] = valor
-                encontrado = True
-                break
-        if not encontrado:
-            sintomas_mapeados.append(s.strip())
-    
-    # Luego buscar coincidencias con difflib
-    for s in sintomas_mapeados:
-        match = difflib.get_close_matches(s, symptom_cols, n=1, cutoff=cutoff)
-        if match:
-            sintomas_validos.append(match[0])
-            coincidencias[s] = match[0]
+        # Un id canónico (elegido con /sintomas/sugerir) no necesita ninguna búsqueda
+        if s in cat.indice_sintoma:
+            sintomas_validos.append(s)
+            coincidencias[s] = s
+            continue
+        encontrados = cat.extractor.extraer(s)
+        if len(encontrados) <= 1 and list(encontrados) != [normalizar_texto(s)]:
+            match = difflib.get_close_matches(s.strip(), cat.symptom_cols, n=1, cutoff=cutoff)
+            if match:
+                encontrados = {s.strip(): match[0]}
+        for fragmento, sintoma in encontrados.items():
+            if sintoma is not None:
+                sintomas_validos.append(sintoma)
+                coincidencias[fragmento] = sintoma
     
     return list(set(sintomas_validos)), coincidencias
 
-def calcular_score(enf_row, sintomas_confirmados):
-    """Calcula el score de similitud entre los síntomas del usuario y una enfermedad."""
-    coincidencia = sum(sintomas_confirmados.get(c) == 1 and enf_row[c] == 1 for c in symptom_cols)
-    total_e = enf_row[symptom_cols].sum()
-    total_u = sum(1 for c in symptom_cols if sintomas_confirmados.get(c) == 1)
-    
-    if total_e == 0 or total_u == 0 or coincidencia == 0:
-        return 0, 0, 0
-    
-    porc_e = coincidencia / total_e
-    porc_u = coincidencia / total_u
-    score = round(100 * (porc_e + porc_u) / 2, 1)
-    
-    return score, coincidencia, total_e
+def calcular_scores(coincidencia: np.ndarray, total_e: np.ndarray, total_u: int) -> np.ndarray:
+    """Score de similitud de cada enfermedad: promedio de coincidencia/total_e y coincidencia/total_u."""
+    if total_u == 0:
+        return np.zeros(len(coincidencia))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        porc_e = coincidencia / total_e
+        porc_u = coincidencia / total_u
+        score = np.round(100 * (porc_e + porc_u) / 2, 1)
+    return np.where((coincidencia == 0) | (total_e == 0), 0.0, score)
+
+def orden_descendente(valores: np.ndarray) -> np.ndarray:
+    """Índices de mayor a menor con los empates en el mismo orden que pandas sort_values(ascending=False)."""
+    n = len(valores)
+    return (np.arange(n)[::-1][valores[::-1].argsort(kind='quicksort')])[::-1]
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Posiciones de los k mayores scores, de mayor a menor; los empates conservan el orden original.
+
+    argpartition separa los candidatos en O(n) y sólo ellos (más los empatados con el k-ésimo)
+    se ordenan, en lugar de ordenar el vector completo.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < n:
+        umbral = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        candidatos = np.flatnonzero(scores >= umbral)
+    else:
+        candidatos = np.arange(n)
+    return candidatos[np.argsort(-scores[candidatos], kind='stable')[:k]]
+
+def mejores_enfermedades(cat: Catalogo, confirmadas: List[int], excluidas: np.ndarray, k: int,
+                         coincidencias: Optional[np.ndarray] = None):
+    """Top k de enfermedades con coincidencia > 0: (filas, scores, coincidencias), de mayor a menor score.
+
+    Sólo se leen las columnas de los síntomas confirmados, así que las enfermedades sin ningún
+    síntoma en común no se tocan. `coincidencias` puede venir ya calculada (p. ej. por lotes).
+    """
+    matriz = cat.matriz
+    if coincidencias is None:
+        coincidencias = matriz.coincidencias(confirmadas)
+    filas = np.flatnonzero((coincidencias > 0) & ~excluidas)
+    scores = calcular_scores(coincidencias[filas], matriz.totales[filas], len(confirmadas))
+    mejores = top_k(scores, k)
+    return filas[mejores], scores[mejores], coincidencias[filas[mejores]]
+
+def columnas_confirmadas(sesion: 'SesionChat', cat: Catalogo) -> List[int]:
+    """Columnas de la matriz que el usuario confirmó."""
+    return [cat.indice_sintoma[s] for s, v in sesion.sintomas_confirmados.items() if v == 1 and s in cat.indice_sintoma]
+
+def coincidencias_de(sesion: 'SesionChat', cat: Catalogo, confirmadas: List[int]) -> np.ndarray:
+    """Coincidencias por enfermedad con los síntomas confirmados.
+
+    Usa las que dejó calculadas el procesamiento por lotes (src.lotes) si corresponden a los
+    mismos síntomas confirmados; si no, las calcula.
+    """
+    guardadas = sesion._coincidencias
+    if guardadas is not None:
+        sesion._coincidencias = None
+        if guardadas[0] == cat.matriz.mascara(confirmadas).tobytes():
+            return guardadas[1]
+    return cat.matriz.coincidencias(confirmadas)
+
+def mapa_preguntados(sesion: 'SesionChat', cat: Catalogo) -> np.ndarray:
+    """Bits de los síntomas preguntados o confirmados. Se arma una vez y después lo mantiene
+    _registrar_respuesta."""
+    if sesion._preguntados is None:
+        columnas = set(columnas_confirmadas(sesion, cat))
+        columnas.update(cat.indice_sintoma[s] for s in sesion.sintomas_preguntados if s in cat.indice_sintoma)
+        sesion._preguntados = cat.matriz.mascara(columnas)
+    return sesion._preguntados
 
 # ===========================
 # FUNCIONES PRINCIPALES
 # ===========================
 def iniciar_diagnostico(datos: DatosUsuario):
     """Inicia una nueva sesión de diagnóstico."""
-    id_sesion = str(uuid.uuid4())
-    imc = datos.peso / (datos.altura ** 2)
-    
-    # Inicializar vector de usuario
-    user_vector = {s: 0 for s in symptom_cols + risk_cols}
-    
-    # Establecer factores de riesgo basados en IMC
-    if imc < 18.5:
-        user_vector['desnutricion'] = 1
-    elif imc < 25:
-        pass  # Peso normal
-    elif imc < 30:
-        user_vector['sobrepeso'] = 1
-    else:
-        user_vector['obesidad'] = 1
-    
-    # Establecer factores de riesgo basados en género
-    user_vector['hombre' if datos.genero == 'M' else 'mujer'] = 1
-    
-    # Establecer factores de riesgo basados en edad
-    if datos.edad <= 12:
-        user_vector['niño'] = 1
-    elif datos.edad <= 18:
-        user_vector['adolescente'] = 1
-    elif datos.edad <= 59:
-        user_vector['adulto'] = 1
-    else:
-        user_vector['adulto_mayor'] = 1
+    cat = catalogo
 
     # Determinar exclusiones por género
     exclusiones = sintomas_exclusivos_hombre if datos.genero == 'M' else sintomas_exclusivos_mujer
     
     # Validar los síntomas iniciales
     sintomas_ingresados = [s.strip().lower() for s in datos.sintomas]
-    sintomas_validos, _ = encontrar_sintomas_validos(sintomas_ingresados)
+    sintomas_validos, _ = encontrar_sintomas_validos(sintomas_ingresados, cat=cat)
     sintomas_validos = [s for s in sintomas_validos if s not in exclusiones]
     
+    sesion = nueva_sesion(str(uuid.uuid4()), datos, sintomas_validos, cat)
+    sesiones[sesion.id_sesion] = sesion
+    return sesion
+
+def nueva_sesion(id_sesion: str, datos: DatosUsuario, sintomas_validos: List[str], cat: Catalogo) -> SesionChat:
+    """Sesión con los síntomas iniciales ya validados, sin registrarla en `sesiones`."""
+    particion = cat.particiones[perfil(datos)]
+    
+    # Inicializar vector de usuario con los factores de riesgo del perfil (género, edad e IMC)
+    user_vector = dict(particion.vector_base)
+    
     # Agregar los síntomas al vector de usuario
     for s in sintomas_validos:
         user_vector[s] = 1
     
     # Guardar grupos confirmados
-    grupos_confirmados = list(set(filter(None, [grupo_por_sintoma.get(s) for s in sintomas_validos])))
+    grupos_confirmados = set(filter(None, [grupo_por_sintoma.get(s) for s in sintomas_validos]))
     
     # Crear la sesión
     sesion = SesionChat(
         id_sesion=id_sesion,
         datos_usuario=datos,
         sintomas_confirmados=user_vector,
-        sintomas_preguntados=sintomas_validos,
+        sintomas_preguntados=set(sintomas_validos),
         grupos_confirmados=grupos_confirmados,
-        preguntas_realizadas=len(sintomas_validos)
+        preguntas_realizadas=len(sintomas_validos),
+        version_dataset=cat.version
     )
-    
-    sesiones[id_sesion] = sesion
+    sesion._catalogo = cat
+    sesion._particion = particion
+    
+    # Si la apertura está en el árbol precompilado, las preguntas se leen de ahí
+    arbol = arbol_preguntas
+    if arbol is not None and arbol.version == cat.version:
+        sesion._nodo_arbol = arbol.raiz(particion.genero, [cat.indice_sintoma[s] for s in sintomas_validos])
+        sesion._arbol = arbol if sesion._nodo_arbol is not None else None
+    return sesion
+
+def copiar_sesion(sesion: SesionChat) -> SesionChat:
+    """Copia independiente del estado de la sesión (sin lock ni especulación), para simular respuestas."""
+    copia = SesionChat(
+        id_sesion=sesion.id_sesion,
+        datos_usuario=sesion.datos_usuario,
+        sintomas_confirmados=dict(sesion.sintomas_confirmados),
+        sintomas_preguntados=set(sesion.sintomas_preguntados),
+        grupos_confirmados=set(sesion.grupos_confirmados),
+        preguntas_realizadas=sesion.preguntas_realizadas,
+        preguntas_desde_ultima_confirmacion=sesion.preguntas_desde_ultima_confirmacion,
+        fase=sesion.fase,
+        version_dataset=sesion.version_dataset,
+        secuencia=sesion.secuencia,
+    )
+    copia._catalogo = sesion._catalogo
+    copia._particion = sesion._particion
+    copia._arbol = sesion._arbol
+    copia._nodo_arbol = sesion._nodo_arbol
+    copia._historial = array('i', sesion._historial)
+    if sesion._preguntados is not None:
+        copia._preguntados = sesion._preguntados.copy()
+    return copia
+
+def tomar_sesion(id_sesion: str) -> SesionChat:
+    """Busca la sesión y la marca como recién usada."""
+    sesion = sesiones.get(id_sesion)
+    if sesion is None:
+        raise ValueError("Sesión no encontrada")
+    sesiones.move_to_end(id_sesion)
+    sesion._ultimo_acceso = time.monotonic()
     return sesion
 
 def siguiente_pregunta(id_sesion: str):
     """Determina la siguiente pregunta a realizar en la fase actual."""
-    if id_sesion not in sesiones:
-        raise ValueError("Sesión no encontrada")
-    
-    sesion = sesiones[id_sesion]
+    sesion = tomar_sesion(id_sesion)
+    with sesion._lock:
+        pregunta = pregunta_especulada(sesion)
+        if pregunta is None:
+            pregunta = calcular_siguiente(sesion)
+        pregunta.secuencia = sesion.secuencia
+        return pregunta
+
+def clave_siguiente(sesion: SesionChat) -> bytes:
+    """Clave en la memoria compartida de la siguiente pregunta de la sesión."""
+    # Todo lo que lee _siguiente_pregunta: las bandas de edad e IMC no cambian la pregunta
+    cat = catalogo_de(sesion)
+    return clave_estado(
+        'pregunta', cat.version, particion_de(sesion).genero, sesion.fase,
+        sesion.preguntas_realizadas < 15, ','.join(sorted(sesion.grupos_confirmados)),
+        cat.matriz.mascara(columnas_confirmadas(sesion, cat)).tobytes(),
+        mapa_preguntados(sesion, cat).tobytes(),
+    )
+
+def clave_diagnostico(sesion: SesionChat, k: int) -> bytes:
+    """Clave del top k: depende sólo del género y de los síntomas confirmados."""
+    cat = catalogo_de(sesion)
+    confirmadas = columnas_confirmadas(sesion, cat)
+    return clave_estado('diagnostico', cat.version, particion_de(sesion).genero, k,
+                        cat.matriz.mascara(confirmadas).tobytes())
+
+def calcular_siguiente(sesion: SesionChat) -> SintomaPregunta:
+    """Siguiente pregunta desde el árbol precompilado, la memoria compartida o, si no, calculada."""
+    pregunta = pregunta_del_arbol(sesion)
+    if pregunta is not None:
+        return pregunta
+    
+    clave = clave_siguiente(sesion)
+    guardado = memo.obtener(clave)
+    if guardado is None:
+        try:
+            resultado = _siguiente_pregunta(sesion)
+        except ValueError as e:
+            resultado = str(e)
+        guardado = (resultado, sesion.fase)
+        memo.guardar(clave, guardado)
+    resultado, sesion.fase = guardado
+    if isinstance(resultado, str):
+        raise ValueError(resultado)
+    return resultado.model_copy()
+
+def pregunta_especulada(sesion: SesionChat) -> Optional[SintomaPregunta]:
+    """Pregunta ya calculada para la respuesta que dio el usuario, o None si no hay una vigente."""
+    if sesion._especulacion is None:
+        return None
+    base, version, sintoma, resultados = sesion._especulacion
+    if sesion.secuencia == base and version == catalogo_de(sesion).version:
+        return None  # todavía no responde: se conserva para la respuesta que venga
+    sesion._especulacion = None
+    if sesion.secuencia != base + 1 or sesion._ultima_respuesta is None or sesion._ultima_respuesta[0] != sintoma:
+        return None
+    if version != catalogo_de(sesion).version:
+        return None  # calculada con otro catálogo (p. ej. la sesión se restauró con otro dataset)
+    resultado, fase = resultados[sesion._ultima_respuesta[1]]
+    sesion.fase = fase
+    if isinstance(resultado, str):
+        raise ValueError(resultado)
+    return resultado.model_copy()
+
+def pregunta_del_arbol(sesion: SesionChat) -> Optional[SintomaPregunta]:
+    """Pregunta precompilada para el camino de respuestas de la sesión, o None si no está en el árbol.
+
+    Reproduce lo que haría _siguiente_pregunta, incluido el cambio de fase y los mensajes finales.
+    """
+    if sesion._nodo_arbol is None:
+        return None
+    arbol, nodo = sesion._arbol, sesion._nodo_arbol
+    sesion.fase = int(arbol.fase[nodo])
+    j = int(arbol.pregunta[nodo])
+    if j < 0:
+        raise ValueError(arbol.MENSAJES_FINALES[j])
+    sintoma = catalogo_de(sesion).symptom_cols[j]
+    return SintomaPregunta(sintoma=sintoma, grupo=grupo_por_sintoma.get(sintoma),
+                           es_relevante=bool(arbol.relevante[nodo]))
+
+def _siguiente_pregunta(sesion: SesionChat) -> SintomaPregunta:
+    cat = catalogo_de(sesion)
+    matriz = cat.matriz
+    symptom_cols = cat.symptom_cols
     
-    # Obtener exclusiones por género
-    exclusivas = enfermedades_exclusivas_hombre if sesion.datos_usuario.genero == 'M' else enfermedades_exclusivas_mujer
-    exclusiones_sintomas = sintomas_exclusivos_hombre if sesion.datos_usuario.genero == 'M' else sintomas_exclusivos_mujer
+    # Exclusiones por género, ya calculadas en la partición de la sesión
+    particion = particion_de(sesion)
+    excluidas = particion.excluidas
     
     # Comprobar que tenemos síntomas confirmados
-    sintomas_confirmados = [s for s, v in sesion.sintomas_confirmados.items() if v == 1 and s in symptom_cols]
-    if not sintomas_confirmados:
+    confirmadas = columnas_confirmadas(sesion, cat)
+    if not confirmadas:
         raise ValueError("No hay síntomas confirmados")
     
-    # Filtrar enfermedades basadas en síntomas confirmados
-    filtro = np.logical_or.reduce([df[s] == 1 for s in sintomas_confirmados])
-    enfermedades_posibles = df[filtro].copy()
-    enfermedades_posibles = enfermedades_posibles[~enfermedades_posibles['nombre_de_la_enfermedad'].isin(exclusivas)]
+    # Síntomas confirmados de cada enfermedad (sólo se recorren esas columnas)
+    coincidencias_todas = coincidencias_de(sesion, cat, confirmadas)
+    
+    def enfermedades_posibles():
+        # Enfermedades con al menos un síntoma confirmado y frecuencia de cada síntoma entre ellas
+        posibles = np.flatnonzero((coincidencias_todas > 0) & ~excluidas)
+        return posibles, matriz.frecuencias(posibles)
+    
+    # Síntomas que ya no se pueden preguntar: preguntados, exclusivos del otro género
+    # o de un grupo exclusivo ya confirmado
+    bloqueados = mapa_preguntados(sesion, cat) | particion.bits_sintomas_excluidos
+    for grupo in sesion.grupos_confirmados:
+        if grupo in cat.bits_grupos:
+            bloqueados = bloqueados | cat.bits_grupos[grupo]
+    preguntables = ~np.unpackbits(bloqueados, count=len(symptom_cols)).astype(bool)
     
     # FASE 1: Preguntas guiadas por síntomas comunes
     if sesion.fase == 1 and sesion.preguntas_realizadas < 15:
-        sintomas_frecuentes = enfermedades_posibles[symptom_cols].sum().sort_values(ascending=False).index.tolist()
-        for sintoma in sintomas_frecuentes:
-            if sintoma in sesion.sintomas_preguntados or sintoma in exclusiones_sintomas:
+        _, frecuencias = enfermedades_posibles()
+        for j in orden_descendente(frecuencias):
+            if not preguntables[j]:
                 continue
-                
-            grupo = grupo_por_sintoma.get(sintoma)
-            if grupo in sesion.grupos_confirmados:
-                continue
-                
-            return SintomaPregunta(sintoma=sintoma, grupo=grupo, es_relevante=True)
+            sintoma = symptom_cols[j]
+            return SintomaPregunta(sintoma=sintoma, grupo=grupo_por_sintoma.get(sintoma), es_relevante=True)
         
         # Si hemos preguntado suficientes síntomas, pasar a fase 2
         sesion.fase = 2
     
     # FASE 2: Preguntas adaptativas basadas en información diagnóstica
     if sesion.fase == 2:
-        # Calcular scores para las enfermedades posibles
-        resultados = []
-        for _, row in enfermedades_posibles.iterrows():
-            score, coincidencia, total_e = calcular_score(row, sesion.sintomas_confirmados)
-            if score == 0:
-                continue
-                
-            pendientes = [s for s in symptom_cols 
-                         if row[s] == 1 and sesion.sintomas_confirmados.get(s, 0) == 0
-                         and s not in exclusiones_sintomas 
-                         and s not in sesion.sintomas_preguntados]
-            
-            resultados.append({
-                'nombre': row['nombre_de_la_enfermedad'],
-                'score': score,
-                'coincidencia': coincidencia,
-                'total_enfermedad': total_e,
-                'pendientes': pendientes
-            })
-        
-        resultados = sorted(resultados, key=lambda x: x['score'], reverse=True)
+        # Calcular scores sólo hasta conocer las 5 enfermedades más probables
+        candidatas, scores, coincidencias = mejores_enfermedades(cat, confirmadas, excluidas, 5, coincidencias_todas)
+        validas = scores > 0
+        candidatas, scores, coincidencias = candidatas[validas], scores[validas], coincidencias[validas]
         
         # Verificar si tenemos un diagnóstico confiable
-        if resultados and resultados[0]['score'] >= 70 and resultados[0]['coincidencia'] / resultados[0]['total_enfermedad'] >= 0.8:
+        if len(candidatas) and scores[0] >= 70 and coincidencias[0] / matriz.totales[candidatas[0]] >= 0.8:
             # Diagnóstico suficientemente confiable
             raise ValueError("Diagnóstico confiable encontrado")
         
-        # Generar la siguiente pregunta más informativa
-        sintomas_prioritarios = {}
-        for enf in resultados[:5]:  # Usar top 5 enfermedades
-            for sintoma in enf['pendientes']:
-                grupo = grupo_por_sintoma.get(sintoma)
-                if grupo in sesion.grupos_confirmados:
-                    continue
-                sintomas_prioritarios[sintoma] = sintomas_prioritarios.get(sintoma, 0) + enf['score']
+        # Generar la siguiente pregunta más informativa: síntomas pendientes del top 5,
+        # pesados por el score de cada enfermedad (sumados en el mismo orden que antes)
+        pendientes = matriz.pendientes(candidatas[:5], bloqueados)
+        pesos = np.zeros(len(symptom_cols))
+        for fila, score in zip(pendientes, scores[:5]):
+            pesos[fila] += score
+        presentes = pendientes.any(axis=0)
         
-        if sintomas_prioritarios:
-            siguiente_sintoma = sorted(sintomas_prioritarios.items(), key=lambda x: -x[1])[0][0]
+        if presentes.any():
+            # Con empate gana el síntoma que apareció primero: por enfermedad y luego por columna
+            empatados = presentes & (pesos == pesos[presentes].max())
+            primera = next(fila for fila in pendientes if (fila & empatados).any())
+            siguiente_sintoma = symptom_cols[int(np.argmax(primera & empatados))]
             return SintomaPregunta(
                 sintoma=siguiente_sintoma, 
                 grupo=grupo_por_sintoma.get(siguiente_sintoma),
                 es_relevante=True
             )
         
-        # Si no hay síntomas prioritarios, usar método de máxima información
-        mejor_sintoma = None
-        mejor_puntaje = 1
-        for sintoma in symptom_cols:
-            if sintoma in sesion.sintomas_preguntados or sintoma in exclusiones_sintomas:
-                continue
-                
-            grupo = grupo_por_sintoma.get(sintoma)
-            if grupo in sesion.grupos_confirmados:
-                continue
-                
-            prevalencia = enfermedades_posibles[sintoma].mean()
-            puntaje = abs(0.5 - prevalencia)  # Más cercano a 0.5 = mejor discriminador
-            if puntaje < mejor_puntaje:
-                mejor_puntaje = puntaje
-                mejor_sintoma = sintoma
-                
-        if mejor_sintoma:
-            return SintomaPregunta(
-                sintoma=mejor_sintoma, 
-                grupo=grupo_por_sintoma.get(mejor_sintoma),
-                es_relevante=False
-            )
+        # Si no hay síntomas prioritarios, usar método de máxima información:
+        # el síntoma con prevalencia más cercana a 0.5 es el mejor discriminador
+        posibles, frecuencias = enfermedades_posibles()
+        if len(posibles):
+            puntajes = np.abs(0.5 - frecuencias / len(posibles))
+            puntajes[~preguntables] = np.inf
+            j = int(np.argmin(puntajes))
+            if puntajes[j] < 1:
+                mejor_sintoma = symptom_cols[j]
+                return SintomaPregunta(
+                    sintoma=mejor_sintoma, 
+                    grupo=grupo_por_sintoma.get(mejor_sintoma),
+                    es_relevante=False
+                )
     
     # Si llegamos aquí, no hay más preguntas
     raise ValueError("No hay más preguntas relevantes")
 
 def responder_pregunta(id_sesion: str, respuesta: RespuestaSintoma):
-    """Registra la respuesta a una pregunta sobre un síntoma."""
-    if id_sesion not in sesiones:
-        raise ValueError("Sesión no encontrada")
+    """Registra la respuesta a una pregunta sobre un síntoma.
+
+    Un reintento de la última respuesta (misma secuencia anterior, o mismo síntoma y valor si
+    no se envía secuencia) se confirma sin volver a contarse. Una secuencia que no es la actual
+    ni la del último reintento se rechaza.
+    """
+    sesion = tomar_sesion(id_sesion)
+    with sesion._lock:
+        ultima = (respuesta.sintoma, respuesta.respuesta)
+        es_reintento = sesion._ultima_respuesta == ultima and respuesta.secuencia in (None, sesion.secuencia - 1)
+        if es_reintento:
+            return {"status": "success", "mensaje": "Respuesta ya registrada", "secuencia": sesion.secuencia}
+        if respuesta.secuencia is not None and respuesta.secuencia != sesion.secuencia:
+            raise ValueError("Secuencia de respuesta desactualizada")
         
-    sesion = sesiones[id_sesion]
+        _registrar_respuesta(sesion, respuesta)
+        sesion.secuencia += 1
+        sesion._ultima_respuesta = ultima
+        return {"status": "success", "mensaje": "Respuesta registrada", "secuencia": sesion.secuencia}
+
+def _registrar_respuesta(sesion: SesionChat, respuesta: RespuestaSintoma):
     sintoma = respuesta.sintoma
     
     # Registrar la respuesta
     sesion.sintomas_confirmados[sintoma] = 1 if respuesta.respuesta else 0
     
     # Actualizar síntomas preguntados
-    if sintoma not in sesion.sintomas_preguntados:
-        sesion.sintomas_preguntados.append(sintoma)
+    sesion.sintomas_preguntados.add(sintoma)
+    j = catalogo_de(sesion).indice_sintoma.get(sintoma)
+    if j is not None:
+        sesion._historial.append(j + 1 if respuesta.respuesta else -(j + 1))
+        if sesion._preguntados is not None:
+            encender_bit(sesion._preguntados, j)
+    
+    # Avanzar en el árbol precompilado sólo si se respondió la pregunta del nodo actual
+    if sesion._nodo_arbol is not None:
+        sesion._nodo_arbol = sesion._arbol.hijo(sesion._nodo_arbol, j, respuesta.respuesta)
     
     # Si la respuesta es positiva y hay un grupo, agregar a grupos confirmados
     if respuesta.respuesta:
         grupo = grupo_por_sintoma.get(sintoma)
-        if grupo and grupo not in sesion.grupos_confirmados:
-            sesion.grupos_confirmados.append(grupo)
+        if grupo:
+            sesion.grupos_confirmados.add(grupo)
             
     # Incrementar contador de preguntas
     sesion.preguntas_realizadas += 1
@@ -424,16 +891,14 @@ def responder_pregunta(id_sesion: str, respuesta: RespuestaSintoma):
     # Si hemos hecho suficientes preguntas, cambiar a fase 2
     if sesion.fase == 1 and sesion.preguntas_realizadas >= 15:
         sesion.fase = 2
-        
-    return {"status": "success", "mensaje": "Respuesta registrada"}
 
-def obtener_diagnostico(id_sesion: str):
-    """Genera un diagnóstico basado en los síntomas confirmados por el usuario."""
-    if id_sesion not in sesiones:
-        raise ValueError("Sesión no encontrada")
-        
-    sesion = sesiones[id_sesion]
-    
+def obtener_diagnostico(id_sesion: str, k: int = 3):
+    """Genera un diagnóstico con las k enfermedades más parecidas a los síntomas confirmados."""
+    sesion = tomar_sesion(id_sesion)
+    with sesion._lock:
+        return _diagnostico(sesion, k)
+
+def _diagnostico(sesion: SesionChat, k: int) -> ResultadoDiagnostico:
     # Verificar cantidad mínima de preguntas
     if sesion.preguntas_realizadas < 5:
         return ResultadoDiagnostico(
@@ -441,36 +906,29 @@ def obtener_diagnostico(id_sesion: str):
             preguntas_realizadas=sesion.preguntas_realizadas
         )
     
-    # Filtrar exclusiones por género
-    exclusivas = enfermedades_exclusivas_hombre if sesion.datos_usuario.genero == 'M' else enfermedades_exclusivas_mujer
-    
-    # Calcular diagnóstico para cada enfermedad
-    resultado = []
-    sintomas_confirmados_count = 0
-    
-    for _, row in df.iterrows():
-        if row['nombre_de_la_enfermedad'] in exclusivas:
-            continue
-            
-        score, coincidencia, total_e = calcular_score(row, sesion.sintomas_confirmados)
-        
-        if coincidencia == 0:
-            continue
-            
-        sintomas_confirmados_count = max(sintomas_confirmados_count, 
-                                         sum(1 for s in symptom_cols if sesion.sintomas_confirmados.get(s) == 1))
-        
-        resultado.append({
-            'nombre': row['nombre_de_la_enfermedad'],
-            'coincidencia': int(coincidencia),
-            'total_enfermedad': int(total_e),
-            'score': score,
-            'descripcion': row['breve_descripción'],
-            'tratamiento': row['tratamiento']
-        })
-    
-    # Ordenar por score y obtener los top 3
-    resultado = sorted(resultado, key=lambda x: x['score'], reverse=True)[:3]
+    # Calcular diagnóstico para cada enfermedad con al menos una coincidencia
+    cat = catalogo_de(sesion)
+    matriz = cat.matriz
+    confirmadas = columnas_confirmadas(sesion, cat)
+    
+    # Seleccionar el top k; los textos sólo se leen para las enfermedades ganadoras.
+    # El top k se comparte entre sesiones con el mismo estado
+    clave = clave_diagnostico(sesion, k)
+    mejores = memo.obtener(clave)
+    if mejores is None:
+        mejores = mejores_enfermedades(cat, confirmadas, particion_de(sesion).excluidas, k,
+                                       coincidencias_de(sesion, cat, confirmadas))
+        memo.guardar(clave, mejores)
+    filas, scores, coincidencias = mejores
+    sintomas_confirmados_count = len(confirmadas) if len(filas) else 0
+    resultado = [{
+        'nombre': cat.nombres[i],
+        'coincidencia': coincidencia,
+        'total_enfermedad': int(matriz.totales[i]),
+        'score': score,
+        'descripcion': cat.descripciones[i],
+        'tratamiento': cat.tratamientos[i]
+    } for i, score, coincidencia in zip(filas.tolist(), scores.tolist(), coincidencias.tolist())]
     
     # Generar mensaje según resultado
     mensaje = None
@@ -495,3 +953,10 @@ def eliminar_sesion(id_sesion: str):
         return {"status": "success", "mensaje": "Sesión eliminada"}
     else:
         raise ValueError("Sesión no encontrada")
+
+def sugerir_sintomas(texto: str, limite: int = 10) -> List[Dict[str, str]]:
+    """Autocompletado sobre el catálogo vigente: ids de síntomas cuyo nombre o sinónimo empieza con `texto`."""
+    return catalogo.vocabulario.sugerir(texto, limite)
+
+def vocabulario_sintomas() -> VocabularioSintomas:
+    return catalogo.vocabulario
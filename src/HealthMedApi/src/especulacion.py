@@ -0,0 +1,56 @@
+import asyncio
+import logging
+import os
+
+from src import chatbot
+from src.chatbot import RespuestaSintoma, SesionChat, SintomaPregunta, copiar_sesion
+
+logger = logging.getLogger(__name__)
+
+# Con HEALTHMED_ESPECULAR=1, después de cada pregunta se calcula en segundo plano la siguiente
+# para "sí" y para "no", mientras el usuario piensa su respuesta
+ESPECULAR = os.getenv("HEALTHMED_ESPECULAR", "0") == "1"
+
+_tareas = set()  # referencias a las tareas en curso para que no las recolecte el GC
+
+
+def especular(sesion: SesionChat, pregunta: SintomaPregunta):
+    """Calcula la pregunta que seguiría a cada respuesta posible y la deja en la sesión.
+
+    El cálculo se hace sobre copias, sin tomar el lock de la sesión; el resultado sólo se guarda
+    si la sesión no recibió respuestas ni cambió de catálogo mientras tanto.
+    """
+    with sesion._lock:
+        if sesion.secuencia != pregunta.secuencia:
+            return
+        copias = {respuesta: copiar_sesion(sesion) for respuesta in (True, False)}
+        version = chatbot.catalogo_de(sesion).version
+
+    resultados = {}
+    for respuesta, copia in copias.items():
+        chatbot._registrar_respuesta(copia, RespuestaSintoma(sintoma=pregunta.sintoma, respuesta=respuesta))
+        try:
+            siguiente = chatbot.calcular_siguiente(copia)
+        except ValueError as e:
+            siguiente = str(e)
+        resultados[respuesta] = (siguiente, copia.fase)
+
+    with sesion._lock:
+        if sesion.secuencia == pregunta.secuencia and chatbot.catalogo_de(sesion).version == version:
+            sesion._especulacion = (pregunta.secuencia, version, pregunta.sintoma, resultados)
+
+
+def lanzar_especulacion(id_sesion: str, pregunta: SintomaPregunta):
+    """Programa `especular` en un hilo aparte sin esperar el resultado."""
+    sesion = chatbot.sesiones.get(id_sesion)
+    if sesion is None:
+        return
+    tarea = asyncio.create_task(asyncio.to_thread(especular, sesion, pregunta))
+    _tareas.add(tarea)
+    tarea.add_done_callback(_terminar)
+
+
+def _terminar(tarea: asyncio.Task):
+    _tareas.discard(tarea)
+    if not tarea.cancelled() and tarea.exception() is not None:
+        logger.error("Falló la especulación de la siguiente pregunta", exc_info=tarea.exception())
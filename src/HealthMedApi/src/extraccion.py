@@ -0,0 +1,183 @@
+import difflib
+import hashlib
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List, Mapping, Optional, Tuple
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sin acentos, con '_' y signos de puntuación como espacios simples."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", texto).split())
+
+
+class ExtractorSintomas:
+    """Autómata de Aho-Corasick sobre frases normalizadas; encuentra todos los síntomas de un texto
+    en una sola pasada.
+
+    Cada estado es un prefijo de alguna frase. `_fallo` apunta al sufijo más largo que también es
+    prefijo y `_salida` al estado de fallo más cercano en el que termina una frase, así que en cada
+    carácter sólo se visitan las frases que efectivamente terminan ahí.
+    """
+
+    def __init__(self, frases: Mapping[str, Optional[str]]):
+        self._hijos: List[Dict[str, int]] = [{}]
+        self._fallo = [0]
+        self._salida = [0]
+        # (largo, síntoma) de la frase que termina en cada estado
+        self._final: List[Optional[Tuple[int, Optional[str]]]] = [None]
+        for frase, sintoma in frases.items():
+            self._agregar(frase, sintoma)
+        self._enlazar()
+
+    def __len__(self):
+        return sum(final is not None for final in self._final)
+
+    def _agregar(self, frase: str, sintoma: Optional[str]):
+        estado = 0
+        for c in frase:
+            siguiente = self._hijos[estado].get(c)
+            if siguiente is None:
+                siguiente = len(self._hijos)
+                self._hijos[estado][c] = siguiente
+                self._hijos.append({})
+                self._fallo.append(0)
+                self._salida.append(0)
+                self._final.append(None)
+            estado = siguiente
+        if self._final[estado] is None:
+            self._final[estado] = (len(frase), sintoma)
+
+    def _enlazar(self):
+        # Recorrido en anchura: el fallo de un estado siempre es menos profundo y ya está resuelto
+        cola = deque(self._hijos[0].values())
+        while cola:
+            estado = cola.popleft()
+            for c, hijo in self._hijos[estado].items():
+                fallo = self._fallo[estado]
+                while fallo and c not in self._hijos[fallo]:
+                    fallo = self._fallo[fallo]
+                destino = self._hijos[fallo].get(c, 0)
+                self._fallo[hijo] = destino if destino != hijo else 0
+                self._salida[hijo] = destino if self._final[destino] is not None else self._salida[destino]
+                cola.append(hijo)
+
+    def buscar(self, texto: str) -> List[Tuple[int, int, Optional[str]]]:
+        """(inicio, fin, síntoma) de cada frase que aparece como palabras completas en `texto`,
+        que ya debe venir normalizado."""
+        encontrados = []
+        hijos, fallo, salida, final = self._hijos, self._fallo, self._salida, self._final
+        n = len(texto)
+        estado = 0
+        for i, c in enumerate(texto):
+            while estado and c not in hijos[estado]:
+                estado = fallo[estado]
+            estado = hijos[estado].get(c, 0)
+            if i + 1 < n and texto[i + 1] != " ":
+                continue
+            actual = estado if final[estado] is not None else salida[estado]
+            while actual:
+                largo, sintoma = final[actual]
+                inicio = i + 1 - largo
+                if inicio == 0 or texto[inicio - 1] == " ":
+                    encontrados.append((inicio, i + 1, sintoma))
+                actual = salida[actual]
+        return encontrados
+
+    def extraer(self, texto: str) -> Dict[str, Optional[str]]:
+        """Fragmento -> síntoma de cada síntoma mencionado en `texto` (None si no está en el dataset).
+
+        Si dos frases se superponen gana la más larga ("dolor pecho al respirar" antes que
+        "pecho"); con el mismo largo, la que aparece primero.
+        """
+        texto = normalizar_texto(texto)
+        ocupado = bytearray(len(texto))
+        resultado = {}
+        for inicio, fin, sintoma in sorted(self.buscar(texto), key=lambda m: (m[0] - m[1], m[0])):
+            if any(ocupado[inicio:fin]):
+                continue
+            ocupado[inicio:fin] = b"\x01" * (fin - inicio)
+            resultado[texto[inicio:fin]] = sintoma
+        return resultado
+
+
+class VocabularioSintomas:
+    """Nombres y sinónimos normalizados en un arreglo ordenado, para autocompletar con bisect.
+
+    Además de cada frase completa se indexa cada sufijo que empieza en una palabra de 3 letras o
+    más, así "cabeza" también sugiere "dolor de cabeza" (después de las que empiezan igual).
+    """
+
+    def __init__(self, frases: Mapping[str, Optional[str]], version: str):
+        self.version = version
+        entradas = []
+        sinonimos: Dict[str, List[str]] = {}
+        for frase, sintoma in frases.items():
+            if sintoma is None:
+                continue
+            palabras = frase.split(" ")
+            for i, palabra in enumerate(palabras):
+                if i == 0 or len(palabra) >= 3:
+                    entradas.append((" ".join(palabras[i:]), i > 0, frase, sintoma))
+            if frase != normalizar_texto(sintoma):
+                sinonimos.setdefault(sintoma, []).append(frase)
+        entradas.sort()
+        self._claves = [clave for clave, *_ in entradas]
+        self._entradas = entradas
+        self.listado = {
+            "version": version,
+            "sintomas": [{"sintoma": s, "sinonimos": sorted(sinonimos.get(s, []))}
+                         for s in sorted(set(frases.values()) - {None})],
+        }
+        h = hashlib.blake2b(digest_size=8)
+        for frase, sintoma in sorted(frases.items()):
+            h.update(f"{frase}\x00{sintoma}\x00".encode("utf-8"))
+        self.etag = f'"{version}-{h.hexdigest()}"'
+
+    def sugerir(self, texto: str, limite: int = 10) -> List[Dict[str, str]]:
+        """Síntomas con alguna frase que empieza con `texto`, uno por síntoma.
+
+        Orden: coincidencia exacta, frase que empieza con el texto (antes que una palabra interna),
+        frase más corta y por último alfabético.
+        """
+        texto = normalizar_texto(texto)
+        if not texto:
+            return []
+        mejores: Dict[str, Tuple] = {}
+        i = bisect_left(self._claves, texto)
+        while i < len(self._claves) and self._claves[i].startswith(texto):
+            _, interna, frase, sintoma = self._entradas[i]
+            rango = (frase != texto, interna, len(frase), frase)
+            if sintoma not in mejores or rango < mejores[sintoma]:
+                mejores[sintoma] = rango
+            i += 1
+        ordenados = sorted(mejores.items(), key=lambda item: item[1])[:limite]
+        return [{"sintoma": sintoma, "texto": rango[-1]} for sintoma, rango in ordenados]
+
+
+def frases_sintomas(symptom_cols: List[str], sinonimos: Mapping[str, str],
+                    cutoff: float = 0.70) -> Dict[str, Optional[str]]:
+    """Frase normalizada -> síntoma, con los nombres de los síntomas y los sinónimos.
+
+    Un sinónimo cuyo destino no es una columna se resuelve con difflib una sola vez, acá: primero
+    el destino y si no el sinónimo mismo. Si ninguno se parece a una columna queda con síntoma None,
+    para que la frase se reconozca igual y no la tape una más corta. Si un sinónimo se escribe igual
+    que una columna, gana la columna.
+    """
+    frases = {}
+    for sintoma in symptom_cols:
+        frase = normalizar_texto(sintoma)
+        if frase:
+            frases.setdefault(frase, sintoma)
+    for clave, valor in sinonimos.items():
+        if valor not in symptom_cols:
+            parecido = (difflib.get_close_matches(valor, symptom_cols, n=1, cutoff=cutoff)
+                        or difflib.get_close_matches(clave, symptom_cols, n=1, cutoff=cutoff))
+            valor = parecido[0] if parecido else None
+        frase = normalizar_texto(clave)
+        if frase:
+            frases.setdefault(frase, valor)
+    return frases
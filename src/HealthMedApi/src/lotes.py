@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src import chatbot
+from src.chatbot import Catalogo, SesionChat
+from src.memo import memo
+
+logger = logging.getLogger(__name__)
+
+# Con HEALTHMED_LOTES=1, las coincidencias de las sesiones que piden pregunta o diagnóstico al
+# mismo tiempo se calculan juntas: se espera hasta LOTE_ESPERA_MS o hasta juntar LOTE_MAX
+AGRUPAR = os.getenv("HEALTHMED_LOTES", "0") == "1"
+LOTE_ESPERA_MS = float(os.getenv("HEALTHMED_LOTE_ESPERA_MS", "2"))
+LOTE_MAX = int(os.getenv("HEALTHMED_LOTE_MAX", "64"))
+
+
+class MicroLotes:
+    """Junta consultas de coincidencias de varias corrutinas y las resuelve con una sola operación.
+
+    Con poca carga (ninguna otra consulta en la última ventana de espera) se calcula en el acto,
+    sin esperar a que se forme un lote.
+    """
+
+    def __init__(self, espera_ms: float = LOTE_ESPERA_MS, max_lote: int = LOTE_MAX):
+        self.espera = espera_ms / 1000
+        self.max_lote = max_lote
+        self._pendientes: List[Tuple[Catalogo, List[int], asyncio.Future]] = []
+        self._temporizador: Optional[asyncio.TimerHandle] = None
+        self._ultima_llegada = 0.0
+        self.lotes = 0
+        self.consultas = 0
+
+    async def coincidencias(self, cat: Catalogo, columnas: List[int]) -> np.ndarray:
+        ahora = time.monotonic()
+        reciente = ahora - self._ultima_llegada < self.espera
+        self._ultima_llegada = ahora
+        if not reciente and not self._pendientes:
+            return cat.matriz.coincidencias(columnas)
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendientes.append((cat, columnas, futuro))
+        if len(self._pendientes) >= self.max_lote:
+            self._procesar()
+        elif self._temporizador is None:
+            self._temporizador = asyncio.get_running_loop().call_later(self.espera, self._procesar)
+        return await futuro
+
+    def _procesar(self):
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        pendientes, self._pendientes = self._pendientes, []
+        if not pendientes:
+            return
+        self.lotes += 1
+        self.consultas += len(pendientes)
+
+        # Un lote por catálogo: las sesiones de antes de una recarga usan el anterior
+        por_catalogo = {}
+        for consulta in pendientes:
+            por_catalogo.setdefault(id(consulta[0]), []).append(consulta)
+        for grupo in por_catalogo.values():
+            try:
+                resultado = grupo[0][0].matriz.coincidencias_lote([columnas for _, columnas, _ in grupo])
+            except Exception as e:
+                for _, _, futuro in grupo:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+            for fila, (_, _, futuro) in zip(resultado, grupo):
+                if not futuro.done():
+                    futuro.set_result(fila)
+
+    def metricas(self) -> dict:
+        return {
+            "lotes": self.lotes,
+            "consultas_en_lote": self.consultas,
+            "promedio_por_lote": round(self.consultas / self.lotes, 2) if self.lotes else 0.0,
+        }
+
+
+lotes = MicroLotes()
+
+
+async def preparar_coincidencias(id_sesion: str, k: Optional[int] = None):
+    """Deja en la sesión las coincidencias que va a necesitar, calculadas junto con otras sesiones.
+
+    Sin `k` prepara la siguiente pregunta y con `k` el diagnóstico. No hace nada si el resultado
+    saldrá del árbol precompilado, de la especulación o de la memoria compartida. Si la sesión
+    cambia mientras tanto, chatbot.coincidencias_de detecta que no corresponden y las recalcula.
+    """
+    sesion: Optional[SesionChat] = chatbot.sesiones.get(id_sesion)
+    if sesion is None:
+        return
+    if k is None:
+        if sesion._nodo_arbol is not None or sesion._especulacion is not None:
+            return
+        clave = chatbot.clave_siguiente(sesion)
+    else:
+        if sesion.preguntas_realizadas < 5:
+            return
+        clave = chatbot.clave_diagnostico(sesion, k)
+    if memo.contiene(clave):
+        return
+    cat = chatbot.catalogo_de(sesion)
+    confirmadas = chatbot.columnas_confirmadas(sesion, cat)
+    if not confirmadas:
+        return
+    resultado = await lotes.coincidencias(cat, confirmadas)
+    sesion._coincidencias = (cat.matriz.mascara(confirmadas).tobytes(), resultado)
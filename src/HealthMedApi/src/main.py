@@ -1,9 +1,14 @@
 # main.py
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Optional
+import asyncio
+import json
+import os
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
 from src.chatbot import (
     DatosUsuario,
@@ -17,15 +22,60 @@ from src.chatbot import (
     obtener_diagnostico,
     eliminar_sesion,
     cargar_dataset,
+    sugerir_sintomas,
+    vocabulario_sintomas,
 )
+from src.recarga import INTERVALO_VIGILANCIA, recargar_dataset, vigilar_dataset
+from src.asistente import PreguntaAsistente, RespuestaAsistente, obtener_asistente
+from src import chatbot, snapshot
+from src.arbol import cargar_arbol
+from src.calentamiento import calentar_en_segundo_plano, estado as estado_calentamiento
+from src.memo import memo
+from src.memoria import reporte_memoria, traza
+from src.lotes import AGRUPAR, lotes, preparar_coincidencias
+from src.especulacion import ESPECULAR, lanzar_especulacion
+from src.admision import MAX_LAG_MS, AdmisionMiddleware, monitor_lag, rechazos, verificar_cupo_sesiones
+from src.barrido import MAX_MB_SESIONES, MAX_SESIONES_MEMORIA, TTL_SESION, barrido_periodico, estado_sesiones
+from src.respuestas import CompresionMiddleware, respuesta_estatica, respuesta_etag, respuesta_modelo, sesion_compacta
 
 DATASET_PATH = Path(__file__).parent / "data" / "Dataset_Enfermedades_Final.csv"
+# Artefacto binario generado por Modelo_diagnostico/Datasets/PROCESAMIENTO_DATASET.PY (opcional)
+DATASET_BINARIO_PATH = DATASET_PATH.with_suffix(".npz")
+ADMIN_TOKEN = os.getenv("HEALTHMED_ADMIN_TOKEN")
+
+
+def ruta_dataset() -> Path:
+    return DATASET_BINARIO_PATH if DATASET_BINARIO_PATH.exists() else DATASET_PATH
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    cargar_dataset(DATASET_PATH)
+    cargar_dataset(ruta_dataset())
+    cargar_arbol()
+    tareas = []
+    if MAX_LAG_MS > 0:
+        tareas.append(asyncio.create_task(monitor_lag.medir()))
+    if TTL_SESION or MAX_SESIONES_MEMORIA or MAX_MB_SESIONES:
+        tareas.append(asyncio.create_task(barrido_periodico()))
+    if INTERVALO_VIGILANCIA > 0:
+        tareas.append(asyncio.create_task(vigilar_dataset(ruta_dataset)))
+    # Las sesiones del proceso anterior se restauran antes de aceptar tráfico
+    if snapshot.SNAPSHOT_DIR:
+        snapshot.restaurar_snapshot(snapshot.SNAPSHOT_DIR)
+        tareas.append(asyncio.create_task(snapshot.snapshots_periodicos(snapshot.SNAPSHOT_DIR)))
+    # Se atiende tráfico desde ya, pero /readyz responde 503 hasta que termina el calentamiento
+    tareas.append(asyncio.create_task(calentar_en_segundo_plano()))
     yield
+    for tarea in tareas:
+        tarea.cancel()
+    if snapshot.SNAPSHOT_DIR:
+        snapshot.guardar_snapshot(snapshot.SNAPSHOT_DIR)
+
+
+async def verificar_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Si HEALTHMED_ADMIN_TOKEN está definido, las rutas de administración lo exigen en X-Admin-Token."""
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Token de administración inválido")
 
 
 app = FastAPI(
@@ -37,8 +87,13 @@ app = FastAPI(
     ),
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+app.add_middleware(CompresionMiddleware, minimum_size=1000)
+# Rechaza antes de hacer cualquier otro trabajo; sólo CORS queda por fuera
+app.add_middleware(AdmisionMiddleware)
+# El último en agregarse es el más externo: así los 429/503 también llevan los headers de CORS
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -50,21 +105,44 @@ app.add_middleware(
 
 @app.get("/", tags=["health"])
 async def root():
-    return {"message": "HealthMed API is running. Visit /docs for documentation."}
+    return respuesta_estatica({"message": "HealthMed API is running. Visit /docs for documentation."})
+
 
+@app.get("/healthz", tags=["health"])
+async def route_healthz():
+    """Liveness: responde mientras el event loop esté vivo, haya terminado o no el calentamiento."""
+    return {"status": "ok", "version_dataset": chatbot.catalogo.version if chatbot.catalogo else None,
+            "calentamiento": estado_calentamiento["estado"]}
 
-@app.post("/iniciar-diagnostico/", response_model=SesionChat, tags=["diagnostico"])
-async def route_iniciar_diagnostico(datos: DatosUsuario):
+
+@app.get("/readyz", tags=["health"])
+async def route_readyz():
+    """Readiness: 503 hasta que el dataset está cargado y terminó el calentamiento."""
+    listo = chatbot.catalogo is not None and estado_calentamiento["listo"]
+    return ORJSONResponse(
+        {"listo": listo, "version_dataset": chatbot.catalogo.version if chatbot.catalogo else None,
+         "calentamiento": dict(estado_calentamiento)},
+        status_code=200 if listo else 503,
+    )
+
+
+@app.post("/iniciar-diagnostico/", response_model=SesionChat, tags=["diagnostico"],
+          dependencies=[Depends(verificar_cupo_sesiones)])
+async def route_iniciar_diagnostico(datos: DatosUsuario, compacto: bool = Query(
+        False, description="Omite de sintomas_confirmados los síntomas en 0")):
     try:
-        return iniciar_diagnostico(datos)
+        sesion = iniciar_diagnostico(datos)
+        return sesion_compacta(sesion) if compacto else respuesta_modelo(sesion)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/siguiente-pregunta/{id_sesion}", response_model=SintomaPregunta, tags=["diagnostico"])
 async def route_siguiente_pregunta(id_sesion: str):
+    if AGRUPAR:
+        await preparar_coincidencias(id_sesion)
     try:
-        return siguiente_pregunta(id_sesion)
+        pregunta = siguiente_pregunta(id_sesion)
     except ValueError as e:
         msg = str(e)
         if msg == "Sesión no encontrada":
@@ -72,6 +150,9 @@ async def route_siguiente_pregunta(id_sesion: str):
         if msg in ("Diagnóstico confiable encontrado", "No hay más preguntas relevantes"):
             raise HTTPException(status_code=200, detail=msg)
         raise HTTPException(status_code=400, detail=msg)
+    if ESPECULAR:
+        lanzar_especulacion(id_sesion, pregunta)
+    return respuesta_modelo(pregunta)
 
 
 @app.post("/responder-pregunta/{id_sesion}", tags=["diagnostico"])
@@ -82,13 +163,17 @@ async def route_responder_pregunta(id_sesion: str, respuesta: RespuestaSintoma):
         msg = str(e)
         if msg == "Sesión no encontrada":
             raise HTTPException(status_code=404, detail=msg)
+        if msg == "Secuencia de respuesta desactualizada":
+            raise HTTPException(status_code=409, detail=msg)
         raise HTTPException(status_code=400, detail=msg)
 
 
 @app.get("/obtener-diagnostico/{id_sesion}", response_model=ResultadoDiagnostico, tags=["diagnostico"])
-async def route_obtener_diagnostico(id_sesion: str):
+async def route_obtener_diagnostico(id_sesion: str, k: int = Query(3, ge=1, le=20)):
+    if AGRUPAR:
+        await preparar_coincidencias(id_sesion, k)
     try:
-        return obtener_diagnostico(id_sesion)
+        return respuesta_modelo(obtener_diagnostico(id_sesion, k))
     except ValueError as e:
         msg = str(e)
         if msg == "Sesión no encontrada":
@@ -99,11 +184,98 @@ async def route_obtener_diagnostico(id_sesion: str):
 @app.delete("/eliminar-sesion/{id_sesion}", tags=["diagnostico"])
 async def route_eliminar_sesion(id_sesion: str):
     try:
-        return eliminar_sesion(id_sesion)
+        return respuesta_estatica(eliminar_sesion(id_sesion))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@app.get("/sintomas", tags=["sintomas"])
+async def route_vocabulario_sintomas(if_none_match: Optional[str] = Header(default=None)):
+    """Todos los ids de síntomas con sus sinónimos; con If-None-Match responde 304 si no cambió."""
+    vocabulario = vocabulario_sintomas()
+    return respuesta_etag(vocabulario.etag, lambda: vocabulario.listado, if_none_match)
+
+
+@app.get("/sintomas/sugerir", tags=["sintomas"])
+async def route_sugerir_sintomas(q: str = Query(..., min_length=1, max_length=100),
+                                 limite: int = Query(10, ge=1, le=50)):
+    return {"q": q, "sugerencias": sugerir_sintomas(q, limite)}
+
+
+@app.post("/preguntar", response_model=RespuestaAsistente, tags=["asistente"])
+async def route_preguntar(datos: PreguntaAsistente):
+    try:
+        return await obtener_asistente().preguntar(datos.pregunta)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/preguntar/stream", tags=["asistente"])
+async def route_preguntar_stream(datos: PreguntaAsistente):
+    """Server-sent events: un evento `data` por fragmento y un evento final `fin` (o `error`)."""
+    async def eventos():
+        try:
+            async for fragmento in obtener_asistente().preguntar_stream(datos.pregunta):
+                yield f"data: {json.dumps({'token': fragmento}, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)}, ensure_ascii=False)}\n\n"
+            return
+        yield "event: fin\ndata: {}\n\n"
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/admin/recargar-dataset", tags=["admin"], dependencies=[Depends(verificar_admin)])
+async def route_recargar_dataset():
+    try:
+        nuevo = await recargar_dataset(ruta_dataset())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "status": "success",
+        "version": nuevo.version,
+        "enfermedades": nuevo.matriz.forma[0],
+        "sintomas": nuevo.matriz.forma[1],
+    }
+
+
+@app.get("/admin/sesiones", tags=["admin"], dependencies=[Depends(verificar_admin)])
+async def route_estado_sesiones():
+    return {**estado_sesiones(), "rechazos": dict(rechazos), "memo": memo.metricas(), "lotes": lotes.metricas()}
+
+
+@app.get("/admin/memoria", tags=["admin"], dependencies=[Depends(verificar_admin)])
+async def route_memoria():
+    return reporte_memoria()
+
+
+@app.post("/admin/memoria/traza", tags=["admin"], dependencies=[Depends(verificar_admin)])
+async def route_iniciar_traza(cuadros: int = Query(1, ge=1, le=50)):
+    """Activa tracemalloc y toma la instantánea base (reemplaza la anterior si ya había una)."""
+    await asyncio.to_thread(traza.iniciar, cuadros)
+    return respuesta_estatica({"status": "success", "mensaje": "Traza de memoria iniciada"})
+
+
+@app.get("/admin/memoria/traza", tags=["admin"], dependencies=[Depends(verificar_admin)])
+async def route_diferencia_traza(top: int = Query(20, ge=1, le=200),
+                                 agrupar: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+                                 reiniciar: bool = False):
+    try:
+        return await asyncio.to_thread(traza.diferencia, top, agrupar, reiniciar)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.delete("/admin/memoria/traza", tags=["admin"], dependencies=[Depends(verificar_admin)])
+async def route_detener_traza():
+    traza.detener()
+    return respuesta_estatica({"status": "success", "mensaje": "Traza de memoria detenida"})
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
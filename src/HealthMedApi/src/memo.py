@@ -0,0 +1,77 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+# Entradas como máximo en la memoria compartida entre sesiones; 0 la desactiva
+MAX_ENTRADAS_MEMO = int(os.getenv("HEALTHMED_MEMO_MAX", "50000"))
+
+
+def clave_estado(*partes) -> bytes:
+    """Hash canónico de un estado: las partes (str, int o bytes) se concatenan con separador."""
+    h = hashlib.blake2b(digest_size=16)
+    for parte in partes:
+        if not isinstance(parte, bytes):
+            parte = str(parte).encode("utf-8")
+        h.update(len(parte).to_bytes(4, "little"))
+        h.update(parte)
+    return h.digest()
+
+
+class MemoCompartida:
+    """Resultados ya calculados para un estado, compartidos por todas las sesiones.
+
+    LRU con tamaño máximo; protegida con un lock porque también se usa desde hilos.
+    """
+
+    def __init__(self, max_entradas: int = MAX_ENTRADAS_MEMO):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def obtener(self, clave: Hashable) -> Optional[Any]:
+        if not self.max_entradas:
+            return None
+        with self._lock:
+            valor = self._entradas.get(clave)
+            if valor is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def contiene(self, clave: Hashable) -> bool:
+        """Consulta sin contar acierto ni fallo ni cambiar el orden LRU."""
+        return clave in self._entradas
+
+    def guardar(self, clave: Hashable, valor: Any):
+        if not self.max_entradas:
+            return
+        with self._lock:
+            self._entradas[clave] = valor
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def metricas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            "entradas": len(self._entradas),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "desalojos": self.desalojos,
+            "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else 0.0,
+        }
+
+
+memo = MemoCompartida()
@@ -0,0 +1,264 @@
+"""Contabilidad de memoria por componente y trazas de asignaciones con tracemalloc.
+
+La API lo expone en /admin/memoria y /admin/memoria/traza. Desde la línea de comandos se
+consulta un proceso en marcha (desde src/HealthMedApi):
+    python -m src.memoria --url http://localhost:8000
+    python -m src.memoria --url http://localhost:8000 --traza 60 --top 15
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import urllib.request
+from array import array
+from collections import deque
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from src import asistente, chatbot, respuestas
+from src.barrido import tamano_sesion
+from src.lotes import lotes
+from src.memo import memo
+
+# Sesiones y entradas de caché que se miden en detalle; el total se extrapola de la muestra
+MUESTRA = int(os.getenv("HEALTHMED_MEMORIA_MUESTRA", "200"))
+
+# ===========================
+# Tamaño de objetos
+# ===========================
+def tamano_profundo(raices: Iterable, vistos: set) -> int:
+    """Bytes de los objetos alcanzables desde `raices` que no estén ya en `vistos`.
+
+    Sólo se recorren contenedores, arreglos de NumPy, modelos de Pydantic y objetos de este
+    paquete; `vistos` se comparte entre componentes para que un objeto compartido (por ejemplo
+    los nombres de síntomas) lo pague sólo el primero que lo mide.
+    """
+    total = 0
+    pendientes = list(raices)
+    while pendientes:
+        obj = pendientes.pop()
+        if obj is None or id(obj) in vistos:
+            continue
+        vistos.add(id(obj))
+        if isinstance(obj, np.ndarray):
+            # Una vista no es dueña de sus datos: se cuentan en su base
+            total += sys.getsizeof(obj)
+            if obj.base is not None:
+                pendientes.append(obj.base)
+            if obj.dtype == object:
+                pendientes.extend(obj.ravel().tolist())
+            continue
+        total += sys.getsizeof(obj)
+        if isinstance(obj, (dict, MappingProxyType)):
+            pendientes.extend(obj.keys())
+            pendientes.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            pendientes.extend(obj)
+        elif isinstance(obj, (str, bytes, bytearray, int, float, bool, array)):
+            pass
+        elif isinstance(obj, BaseModel):
+            pendientes.append(obj.__dict__)
+            pendientes.append(obj.__pydantic_private__)
+        elif type(obj).__module__.startswith("src.") and hasattr(obj, "__dict__"):
+            pendientes.append(obj.__dict__)
+    return total
+
+
+def _muestra(objetos: List, n: int = MUESTRA) -> List:
+    return objetos if len(objetos) <= n else random.sample(objetos, n)
+
+
+def _estimar(objetos: List, vistos: set) -> Dict:
+    """Total estimado de una colección grande a partir de una muestra."""
+    muestra = _muestra(objetos)
+    medido = tamano_profundo(muestra, vistos)
+    por_objeto = medido / len(muestra) if muestra else 0
+    return {"cantidad": len(objetos), "bytes": int(por_objeto * len(objetos)),
+            "bytes_por_elemento": int(por_objeto), "muestra": len(muestra)}
+
+
+def rss_bytes() -> int:
+    """RSS actual del proceso (Linux); si no hay /proc, el máximo que informa resource."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+# ===========================
+# Reporte por componente
+# ===========================
+def reporte_memoria() -> Dict:
+    """Bytes por componente. Cada objeto se cuenta una vez, en el primer componente que lo alcanza."""
+    vistos = set()
+    cat = chatbot.catalogo
+    m = cat.matriz
+    componentes = {}
+
+    componentes["dataset"] = {
+        "version": cat.version,
+        "matriz": tamano_profundo([m.indptr, m.indices, m.col_indptr, m.col_indices], vistos),
+        "bits": tamano_profundo([m.bits], vistos),
+        "textos": tamano_profundo([cat.nombres, cat.descripciones, cat.tratamientos], vistos),
+        "sintomas": tamano_profundo([cat.symptom_cols, cat.indice_sintoma], vistos),
+    }
+    componentes["indices"] = {
+        "particiones": tamano_profundo([cat.particiones, cat.bits_grupos], vistos),
+        "extractor": tamano_profundo([cat.extractor], vistos),
+        "vocabulario": tamano_profundo([cat.vocabulario], vistos),
+        "arbol_preguntas": tamano_profundo([chatbot.arbol_preguntas], vistos),
+    }
+
+    sesiones = list(chatbot.sesiones.values())
+    # Catálogos de antes de una recarga que siguen vivos por las sesiones que los usan
+    anteriores = {id(s._catalogo): s._catalogo for s in sesiones
+                  if s._catalogo is not None and s._catalogo is not cat}
+    componentes["catalogos_anteriores"] = {
+        "cantidad": len(anteriores),
+        "bytes": tamano_profundo(anteriores.values(), vistos),
+    }
+    componentes["sesiones"] = {
+        **_estimar(sesiones, vistos),
+        "bytes_presupuesto": sum(tamano_sesion(s) for s in sesiones),
+    }
+
+    cache_asistente = asistente._asistente.cache._entradas if asistente._asistente else {}
+    componentes["caches"] = {
+        "memo": _estimar(list(memo._entradas.items()), vistos),
+        "respuestas_precodificadas": tamano_profundo([respuestas._precodificadas, respuestas._con_etag], vistos),
+        "asistente": tamano_profundo([cache_asistente], vistos),
+        "lotes_pendientes": len(lotes._pendientes),
+    }
+
+    return {
+        "rss_bytes": rss_bytes(),
+        "pandas_cargado": "pandas" in sys.modules,
+        "componentes": componentes,
+    }
+
+# ===========================
+# Trazas con tracemalloc
+# ===========================
+class TrazaMemoria:
+    """Diferencia de asignaciones entre una instantánea base y el momento de la consulta.
+
+    tracemalloc agrega costo a cada asignación, así que sólo está activo entre `iniciar` y `detener`.
+    """
+
+    FILTROS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+
+    def __init__(self):
+        self._base: Optional[tracemalloc.Snapshot] = None
+        self._inicio = 0.0
+
+    def _instantanea(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(self.FILTROS)
+
+    def iniciar(self, cuadros: int = 1):
+        if tracemalloc.is_tracing() and tracemalloc.get_traceback_limit() != cuadros:
+            tracemalloc.stop()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(cuadros)
+        self._base = self._instantanea()
+        self._inicio = time.monotonic()
+
+    def diferencia(self, top: int = 20, agrupar: str = "lineno", reiniciar: bool = False) -> Dict:
+        """Los `top` sitios con más bytes asignados (y no liberados) desde la base."""
+        if self._base is None:
+            raise ValueError("No hay una traza de memoria activa")
+        actual = self._instantanea()
+        estadisticas = actual.compare_to(self._base, agrupar)
+        resultado = {
+            "segundos": round(time.monotonic() - self._inicio, 3),
+            "diferencia_bytes": sum(e.size_diff for e in estadisticas),
+            "sitios": [
+                {
+                    "ubicacion": [f"{cuadro.filename}:{cuadro.lineno}" for cuadro in e.traceback],
+                    "diferencia_bytes": e.size_diff,
+                    "bytes": e.size,
+                    "diferencia_bloques": e.count_diff,
+                }
+                for e in estadisticas[:top]
+            ],
+        }
+        if reiniciar:
+            self._base = actual
+            self._inicio = time.monotonic()
+        return resultado
+
+    def detener(self):
+        self._base = None
+        tracemalloc.stop()
+
+
+traza = TrazaMemoria()
+
+# ===========================
+# Línea de comandos
+# ===========================
+def _pedir(url: str, metodo: str = "GET", token: Optional[str] = None) -> Dict:
+    peticion = urllib.request.Request(url, method=metodo)
+    if token:
+        peticion.add_header("X-Admin-Token", token)
+    with urllib.request.urlopen(peticion) as respuesta:
+        return json.loads(respuesta.read() or b"{}")
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1024 / 1024:9.2f} MB"
+
+
+def imprimir_reporte(reporte: Dict):
+    print(f"RSS {_mb(reporte['rss_bytes']).strip()}  (pandas cargado: {reporte['pandas_cargado']})")
+    for componente, partes in reporte["componentes"].items():
+        print(componente)
+        for nombre, valor in partes.items():
+            if isinstance(valor, dict):
+                print(f"  {nombre:28} {_mb(valor['bytes'])}  ({valor['cantidad']} x {valor['bytes_por_elemento']} B)")
+            elif nombre in ("version", "cantidad", "muestra", "lotes_pendientes"):
+                print(f"  {nombre:28} {valor}")
+            elif nombre == "bytes_por_elemento":
+                print(f"  {nombre:28} {valor:9d} B")
+            else:
+                print(f"  {nombre:28} {_mb(valor)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria por componente de una API en marcha.")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", default=os.getenv("HEALTHMED_ADMIN_TOKEN"), help="X-Admin-Token")
+    parser.add_argument("--traza", type=float, default=0,
+                        help="Segundos entre las dos instantáneas de tracemalloc (0: sólo el reporte)")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    base = args.url.rstrip("/") + "/admin/memoria"
+
+    imprimir_reporte(_pedir(base, token=args.token))
+    if not args.traza:
+        return
+    _pedir(base + "/traza", "POST", args.token)
+    try:
+        time.sleep(args.traza)
+        diferencia = _pedir(f"{base}/traza?top={args.top}", token=args.token)
+    finally:
+        _pedir(base + "/traza", "DELETE", args.token)
+    print(f"\nAsignaciones en {diferencia['segundos']} s: {diferencia['diferencia_bytes'] / 1024:+.1f} KB")
+    for sitio in diferencia["sitios"]:
+        print(f"  {sitio['diferencia_bytes'] / 1024:+10.1f} KB  {sitio['diferencia_bloques']:+7d}  "
+              f"{sitio['ubicacion'][-1]}")
+
+
+if __name__ == "__main__":
+    main()
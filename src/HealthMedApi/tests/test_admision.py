@@ -0,0 +1,89 @@
+import asyncio
+import ipaddress
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+
+from src.admision import AdmisionMiddleware, BackendMemoria, clave_cliente, ip_cliente
+
+PROXIES = [ipaddress.ip_network("10.0.0.0/8")]
+
+
+def _scope(ip, reenviado=None, api_key=None):
+    headers = []
+    if reenviado is not None:
+        headers.append((b"x-forwarded-for", reenviado.encode()))
+    if api_key is not None:
+        headers.append((b"x-api-key", api_key.encode()))
+    return {"type": "http", "client": (ip, 5000), "headers": headers}
+
+
+def test_x_forwarded_for_solo_desde_proxy_confiable():
+    # Desde un proxy confiable se toma la IP real del cliente
+    assert ip_cliente(_scope("10.0.0.5", "203.0.113.7"), PROXIES) == "203.0.113.7"
+    # Los saltos agregados por otros proxies confiables se saltean de derecha a izquierda
+    assert ip_cliente(_scope("10.0.0.5", "1.2.3.4, 203.0.113.7, 10.0.0.9"), PROXIES) == "203.0.113.7"
+    # Un cliente directo no puede falsificar su IP con el header
+    assert ip_cliente(_scope("198.51.100.1", "203.0.113.7"), PROXIES) == "198.51.100.1"
+    assert ip_cliente(_scope("10.0.0.5", "203.0.113.7"), []) == "10.0.0.5"
+    assert ip_cliente(_scope("10.0.0.5"), PROXIES) == "10.0.0.5"
+
+
+def test_clave_cliente_prefiere_api_key():
+    assert clave_cliente(_scope("198.51.100.1", api_key="abc")) == "key:abc"
+    assert clave_cliente(_scope("198.51.100.1")) == "ip:198.51.100.1"
+
+
+def test_backend_memoria_descarta_el_cliente_menos_reciente():
+    backend = BackendMemoria(max_clientes=2)
+
+    async def pedir(clave):
+        return await backend.consumir(clave, tasa=1.0, rafaga=1.0)
+
+    async def escenario():
+        assert await pedir("a") == 0
+        assert await pedir("b") == 0
+        assert await pedir("a") > 0  # "a" pasa a ser el más reciente
+        assert await pedir("c") == 0  # se descarta "b"
+        return list(backend._cubetas)
+
+    assert asyncio.run(escenario()) == ["a", "c"]
+
+
+def _app():
+    app = FastAPI()
+
+    @app.get("/eco")
+    async def eco():
+        return {"ok": True}
+
+    app.add_middleware(AdmisionMiddleware, tasa=1.0, rafaga=1.0, max_lag_ms=0, backend=BackendMemoria())
+    app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+    return app
+
+
+def test_rechazo_lleva_headers_de_cors_y_preflight_no_consume():
+    cliente = TestClient(_app())
+    origen = {"Origin": "http://example.com"}
+    preflight = {**origen, "Access-Control-Request-Method": "GET"}
+    for _ in range(3):
+        assert cliente.options("/eco", headers=preflight).status_code == 200
+    assert cliente.get("/eco", headers=origen).status_code == 200
+    rechazo = cliente.get("/eco", headers=origen)
+    assert rechazo.status_code == 429
+    assert rechazo.headers["access-control-allow-origin"] == "*"
+    assert "retry-after" in rechazo.headers
+
+
+def test_cors_es_el_middleware_mas_externo():
+    from src.main import app
+
+    assert app.user_middleware[0].cls is CORSMiddleware
+
+
+def test_options_no_se_limita():
+    app = FastAPI()
+    app.add_middleware(AdmisionMiddleware, tasa=1.0, rafaga=1.0, max_lag_ms=0, backend=BackendMemoria())
+    cliente = TestClient(app)
+    assert 429 not in [cliente.options("/eco").status_code for _ in range(3)]
@@ -0,0 +1,77 @@
+from src import chatbot
+from src.arbol import (NO_EXPANDIDO, ArbolPreguntas, aperturas_frecuentes, cargar_arbol, compilar_arbol,
+                       guardar_arbol)
+from src.chatbot import RespuestaSintoma
+
+from conftest import HOMBRE, MUJER
+
+
+def _en_vivo(sesion):
+    """(código o columna, fase, relevante) que calcula _siguiente_pregunta sin el árbol."""
+    cat = chatbot.catalogo_de(sesion)
+    try:
+        p = chatbot._siguiente_pregunta(sesion)
+    except ValueError as e:
+        codigo = {m: c for c, m in ArbolPreguntas.MENSAJES_FINALES.items()}[str(e)]
+        return codigo, sesion.fase, True
+    return cat.indice_sintoma[p.sintoma], sesion.fase, p.es_relevante
+
+
+def _comparar(arbol, nodo, sesion, cat):
+    visitados = 1
+    assert (int(arbol.pregunta[nodo]), int(arbol.fase[nodo]), bool(arbol.relevante[nodo])) == _en_vivo(
+        chatbot.copiar_sesion(sesion))
+    j = int(arbol.pregunta[nodo])
+    for respuesta, hijos in ((True, arbol.si), (False, arbol.no)):
+        if hijos[nodo] == NO_EXPANDIDO:
+            continue
+        hijo = chatbot.copiar_sesion(sesion)
+        chatbot._registrar_respuesta(hijo, RespuestaSintoma(sintoma=cat.symptom_cols[j], respuesta=respuesta))
+        visitados += _comparar(arbol, int(hijos[nodo]), hijo, cat)
+    return visitados
+
+
+def _compilar(cat):
+    return compilar_arbol(cat, aperturas_frecuentes(cat, 5), profundidad=20, min_pacientes=1)
+
+
+def test_cada_nodo_coincide_con_el_calculo_en_vivo(catalogo):
+    arbol = _compilar(catalogo)
+    assert arbol.raices
+    visitados = 0
+    for (genero, columnas), raiz in arbol.raices.items():
+        datos = HOMBRE if genero == 'M' else MUJER
+        sesion = chatbot.nueva_sesion("prueba", datos, [catalogo.symptom_cols[j] for j in columnas], catalogo)
+        visitados += _comparar(arbol, raiz, sesion, catalogo)
+    assert visitados == len(arbol)
+
+
+def test_sesion_recorre_el_arbol(catalogo, tmp_path):
+    path = guardar_arbol(_compilar(catalogo), tmp_path / "arbol.npz")
+    arbol = cargar_arbol(path)
+    assert arbol is not None and chatbot.arbol_preguntas is arbol
+
+    (genero, columnas), _ = next(iter(arbol.raices.items()))
+    datos = HOMBRE if genero == 'M' else MUJER
+    sesion = chatbot.nueva_sesion("prueba", datos, [catalogo.symptom_cols[j] for j in columnas], catalogo)
+    assert sesion._nodo_arbol is not None
+    esperada = chatbot._siguiente_pregunta(chatbot.copiar_sesion(sesion))
+    assert chatbot.pregunta_del_arbol(sesion) == esperada
+
+
+def test_arbol_de_otra_version_se_ignora(catalogo, otro_catalogo, tmp_path, monkeypatch):
+    path = guardar_arbol(_compilar(catalogo), tmp_path / "arbol.npz")
+    monkeypatch.setattr(chatbot, "catalogo", otro_catalogo)
+
+    assert cargar_arbol(path) is None
+    assert chatbot.arbol_preguntas is None
+    # Las sesiones usan el cálculo en vivo
+    sesion = chatbot.nueva_sesion("prueba", MUJER, ["fiebre", "tos"], otro_catalogo)
+    assert sesion._nodo_arbol is None
+    assert chatbot.pregunta_del_arbol(sesion) is None
+    esperada = chatbot._siguiente_pregunta(chatbot.copiar_sesion(sesion))
+    assert chatbot.calcular_siguiente(sesion) == esperada
+
+
+def test_sin_archivo(catalogo, tmp_path):
+    assert cargar_arbol(tmp_path / "no_existe.npz") is None
@@ -0,0 +1,153 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src import asistente
+from src.asistente import Asistente, BackendStub, configurar_asistente, obtener_asistente
+
+
+class BackendContador(BackendStub):
+    """BackendStub que registra cuántas llamadas al modelo llegaron a estar en curso a la vez."""
+
+    def __init__(self, latencia: float = 0.05):
+        super().__init__(latencia)
+        self.en_curso = 0
+        self.max_en_curso = 0
+
+    async def responder(self, pregunta, contexto):
+        self.en_curso += 1
+        self.max_en_curso = max(self.max_en_curso, self.en_curso)
+        try:
+            return await super().responder(pregunta, contexto)
+        finally:
+            self.en_curso -= 1
+
+
+class BackendRoto(BackendStub):
+    async def responder(self, pregunta, contexto):
+        raise RuntimeError("modelo caído")
+
+
+@pytest.fixture
+def configurar(monkeypatch):
+    """Publica un asistente con el backend dado (sin leer el glosario) y restaura el anterior al final."""
+    monkeypatch.setattr(asistente, "_asistente", asistente._asistente)
+
+    def _configurar(backend, **kwargs):
+        instancia = Asistente(backend=backend, **kwargs)
+        instancia._contexto = ["La hipertensión arterial es una condición crónica."]
+        configurar_asistente(instancia)
+        return instancia
+
+    return _configurar
+
+
+def test_configurar_asistente_reemplaza_el_del_proceso(configurar):
+    instancia = configurar(BackendStub())
+    assert obtener_asistente() is instancia
+
+    configurar_asistente(None)
+    nuevo = obtener_asistente()
+    assert nuevo is not instancia
+    assert obtener_asistente() is nuevo
+
+
+def test_preguntar_responde_y_luego_sirve_desde_cache(cliente, configurar):
+    backend = BackendStub()
+    configurar(backend)
+
+    primera = cliente.post("/preguntar", json={"pregunta": "¿La hipertensión es curable?"})
+    assert primera.status_code == 200
+    assert primera.json() == {"respuesta": "Respuesta de prueba a: ¿La hipertensión es curable?",
+                              "desde_cache": False}
+
+    # Misma pregunta con otra forma: no vuelve a llamar al modelo
+    segunda = cliente.post("/preguntar", json={"pregunta": "la hipertension es curable"})
+    assert segunda.status_code == 200
+    assert segunda.json() == {**primera.json(), "desde_cache": True}
+    assert backend.llamadas == 1
+
+
+def test_preguntar_devuelve_500_si_falla_el_backend(cliente, configurar):
+    configurar(BackendRoto())
+    respuesta = cliente.post("/preguntar", json={"pregunta": "¿Qué es la presión arterial?"})
+    assert respuesta.status_code == 500
+    assert respuesta.json()["detail"] == "modelo caído"
+
+
+def test_semaforo_limita_llamadas_simultaneas_al_modelo(catalogo, configurar):
+    from src.main import app
+
+    backend = BackendContador()
+    configurar(backend, max_concurrentes=2)
+
+    async def escenario():
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test") as cliente:
+            # Preguntas distintas para que ninguna se resuelva desde el caché
+            return await asyncio.gather(*[
+                cliente.post("/preguntar", json={"pregunta": f"¿Cuánto es {n} mg de enalapril?"})
+                for n in range(6)
+            ])
+
+    respuestas = asyncio.run(escenario())
+    assert [r.status_code for r in respuestas] == [200] * 6
+    assert backend.llamadas == 6
+    assert backend.max_en_curso == 2
+
+
+class BackendStreamRoto(BackendStub):
+    async def responder_stream(self, pregunta, contexto):
+        yield "Respuesta"
+        raise RuntimeError("modelo caído")
+
+
+def _eventos(cliente, pregunta):
+    """Envía la pregunta a /preguntar/stream y devuelve la respuesta y sus eventos como (tipo, datos)."""
+    with cliente.stream("POST", "/preguntar/stream", json={"pregunta": pregunta}) as respuesta:
+        cuerpo = "".join(respuesta.iter_text())
+    eventos = []
+    for bloque in cuerpo.split("\n\n"):
+        if not bloque:
+            continue
+        tipo, datos = "message", ""
+        for linea in bloque.split("\n"):
+            if linea.startswith("event:"):
+                tipo = linea[len("event:"):].strip()
+            elif linea.startswith("data:"):
+                datos += linea[len("data:"):].strip()
+        eventos.append((tipo, json.loads(datos)))
+    return respuesta, eventos
+
+
+def test_stream_envia_un_evento_por_fragmento_y_termina_con_fin(cliente, configurar):
+    backend = BackendStub()
+    configurar(backend)
+
+    respuesta, eventos = _eventos(cliente, "¿Qué es la presión arterial?")
+    assert respuesta.status_code == 200
+    assert respuesta.headers["content-type"].startswith("text/event-stream")
+    assert respuesta.headers["cache-control"] == "no-cache"
+    assert eventos[-1] == ("fin", {})
+    fragmentos = [datos["token"] for tipo, datos in eventos[:-1]]
+    assert {tipo for tipo, _ in eventos[:-1]} == {"message"}
+    assert len(fragmentos) > 1
+    assert "".join(fragmentos) == "Respuesta de prueba a: ¿Qué es la presión arterial?"
+
+    # La respuesta completa queda en el caché y se entrega como un único fragmento
+    _, eventos = _eventos(cliente, "¿Qué es la presión arterial?")
+    assert eventos == [("message", {"token": "Respuesta de prueba a: ¿Qué es la presión arterial?"}),
+                       ("fin", {})]
+    assert backend.llamadas == 1
+
+
+def test_stream_termina_con_evento_error_si_falla_el_backend(cliente, configurar):
+    instancia = configurar(BackendStreamRoto())
+
+    respuesta, eventos = _eventos(cliente, "¿Qué es la presión arterial?")
+    assert respuesta.status_code == 200
+    assert eventos == [("message", {"token": "Respuesta"}), ("error", {"detail": "modelo caído"})]
+    # Una respuesta a medias no se guarda en el caché
+    assert instancia.cache.obtener("¿Qué es la presión arterial?", instancia.contexto) is None
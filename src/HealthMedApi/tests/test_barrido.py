@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from src import barrido, chatbot
+from src.barrido import barrer_sesiones, tamano_sesion
+from src.chatbot import RespuestaSintoma
+from src.especulacion import especular
+
+from conftest import MUJER
+
+
+@pytest.fixture
+def registrar(catalogo, monkeypatch):
+    """Registra sesiones nuevas en orden (de la menos a la más recientemente usada)."""
+    monkeypatch.setattr(barrido, "desalojos", {"ttl": 0, "cantidad": 0, "memoria": 0})
+
+    def _registrar(*ids, sintomas=("fiebre", "tos")):
+        for id_sesion in ids:
+            chatbot.sesiones[id_sesion] = chatbot.nueva_sesion(id_sesion, MUJER, list(sintomas), catalogo)
+        return [chatbot.sesiones[i] for i in ids]
+
+    return _registrar
+
+
+def test_tamano_incluye_el_estado_privado_de_la_sesion(registrar):
+    sesion, = registrar("s1")
+    inicial = tamano_sesion(sesion)
+
+    chatbot.responder_pregunta("s1", RespuestaSintoma(sintoma="fatiga", respuesta=True))
+    pregunta = chatbot.siguiente_pregunta("s1")
+    assert sesion._historial and sesion._preguntados is not None
+    con_historial = tamano_sesion(sesion)
+    assert con_historial > inicial
+
+    # Coincidencias como las deja src.lotes
+    cat = chatbot.catalogo_de(sesion)
+    confirmadas = chatbot.columnas_confirmadas(sesion, cat)
+    sesion._coincidencias = (cat.matriz.mascara(confirmadas).tobytes(), cat.matriz.coincidencias(confirmadas))
+    con_coincidencias = tamano_sesion(sesion)
+    assert con_coincidencias > con_historial + sesion._coincidencias[1].nbytes
+
+    especular(sesion, pregunta)
+    assert sesion._especulacion is not None
+    assert tamano_sesion(sesion) > con_coincidencias
+
+
+def test_barrido_por_ttl_elimina_solo_las_vencidas(registrar):
+    viejas = registrar("a", "b")
+    registrar("c")
+    for sesion in viejas:
+        sesion._ultimo_acceso = time.monotonic() - 120
+
+    assert barrer_sesiones(ttl=60, max_sesiones=0, max_bytes=0) == {"ttl": 2, "cantidad": 0, "memoria": 0}
+    assert list(chatbot.sesiones) == ["c"]
+    assert barrido.desalojos["ttl"] == 2
+
+
+def test_barrido_por_cantidad_respeta_el_orden_lru(registrar):
+    registrar("a", "b", "c", "d")
+    # Usar "a" la pasa a ser la más reciente
+    chatbot.tomar_sesion("a")
+
+    assert barrer_sesiones(ttl=0, max_sesiones=2, max_bytes=0) == {"ttl": 0, "cantidad": 2, "memoria": 0}
+    assert list(chatbot.sesiones) == ["d", "a"]
+
+
+def test_barrido_por_bytes_elimina_las_menos_usadas_hasta_cumplir(registrar):
+    sesiones = registrar("a", "b", "c", "d")
+    chatbot.tomar_sesion("b")
+    tamanos = {s.id_sesion: tamano_sesion(s) for s in sesiones}
+    # Cabe todo menos una sesión y media: hay que eliminar "a" y "c", las dos menos usadas
+    presupuesto = sum(tamanos.values()) - tamanos["a"] - tamanos["c"] // 2
+
+    assert barrer_sesiones(ttl=0, max_sesiones=0, max_bytes=presupuesto) == {"ttl": 0, "cantidad": 0, "memoria": 2}
+    assert list(chatbot.sesiones) == ["d", "b"]
+    assert sum(tamano_sesion(s) for s in chatbot.sesiones.values()) <= presupuesto
+
+
+def test_barrido_sin_limites_no_elimina_nada(registrar):
+    registrar("a", "b")
+    assert barrer_sesiones(ttl=0, max_sesiones=0, max_bytes=0) == {"ttl": 0, "cantidad": 0, "memoria": 0}
+    assert list(chatbot.sesiones) == ["a", "b"]
@@ -0,0 +1,44 @@
+import pytest
+
+from src.cache_semantico import CacheSemantico, normalizar_pregunta, similitud_coseno, vectorizar
+
+CONTEXTO = ["La hipertensión arterial es una condición crónica."]
+
+# Preguntas casi idénticas en trigramas pero con otro sentido
+PARES_DISTINTOS = [
+    ("¿Puedo dejar de tomar medicamento si ya me siento bien?",
+     "¿Puedo dejar de tomar medicamento si ya no me siento bien?"),
+    ("¿La hipertensión en el embarazo es peligrosa para la madre y para el bebé?",
+     "¿La hipotensión en el embarazo es peligrosa para la madre y para el bebé?"),
+    ("¿Puedo tomar 50 mg de losartán todos los días junto con la comida del mediodía?",
+     "¿Puedo tomar 100 mg de losartán todos los días junto con la comida del mediodía?"),
+]
+
+
+def _similitud(a, b):
+    return similitud_coseno(vectorizar(normalizar_pregunta(a)), vectorizar(normalizar_pregunta(b)))
+
+
+@pytest.mark.parametrize("guardada,consultada", PARES_DISTINTOS)
+def test_no_reutiliza_respuesta_de_pregunta_con_otro_sentido(guardada, consultada):
+    cache = CacheSemantico()
+    # Los pares superan el umbral: lo que los separa es la firma de contenido
+    assert _similitud(guardada, consultada) >= cache.umbral
+    cache.guardar(guardada, CONTEXTO, "respuesta")
+    assert cache.obtener(consultada, CONTEXTO) is None
+    assert cache.metricas()["fallos"] == 1
+
+
+def test_reutiliza_respuesta_de_pregunta_reordenada():
+    cache = CacheSemantico()
+    cache.guardar("¿La hipertensión es curable?", CONTEXTO, "respuesta")
+    assert cache.obtener("la hipertension es curable", CONTEXTO) == "respuesta"
+    assert cache.obtener("¿Es curable la hipertensión?", CONTEXTO) == "respuesta"
+    assert cache.metricas()["aciertos_exactos"] == 1
+    assert cache.metricas()["aciertos_similares"] == 1
+
+
+def test_no_reutiliza_respuesta_con_otro_contexto():
+    cache = CacheSemantico()
+    cache.guardar("¿La hipertensión es curable?", CONTEXTO, "respuesta")
+    assert cache.obtener("¿La hipertensión es curable?", ["Otro documento."]) is None
@@ -0,0 +1,101 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from src import respuestas
+from src.respuestas import CompresionMiddleware, calidades_codificacion, elegir_codificacion
+
+GRANDE = "hipertensión " * 200
+
+# br es opcional (ver src.respuestas)
+requiere_brotli = pytest.mark.skipif(respuestas.brotli is None, reason="brotli no está instalado")
+
+
+@pytest.fixture
+def cliente():
+    app = FastAPI()
+    app.add_middleware(CompresionMiddleware, minimum_size=500)
+
+    @app.get("/grande")
+    async def grande():
+        return PlainTextResponse(GRANDE)
+
+    @app.get("/chica")
+    async def chica():
+        return PlainTextResponse("ok")
+
+    return TestClient(app)
+
+
+def _pedir(cliente, ruta, accept_encoding):
+    return cliente.get(ruta, headers={"Accept-Encoding": accept_encoding})
+
+
+def test_calidades_codificacion():
+    assert calidades_codificacion("gzip, br;q=0.5, *;q=0") == {"gzip": 1.0, "br": 0.5, "*": 0.0}
+    assert calidades_codificacion(" BR ; Q=0 ,gzip;q=0.8") == {"br": 0.0, "gzip": 0.8}
+    # Una q inválida o fuera de rango descarta la entrada
+    assert calidades_codificacion("br;q=alta, gzip;q=2, deflate") == {"deflate": 1.0}
+    assert calidades_codificacion("") == {}
+
+
+@pytest.mark.parametrize("accept_encoding,esperada", [
+    ("gzip, deflate, br", "br"),
+    ("br;q=0, gzip", "gzip"),
+    ("br;q=0.5, gzip;q=0.9", "gzip"),
+    ("br;q=0.9, gzip;q=0.9", "br"),
+    # "brotli" o "xbr" no son br
+    ("brotli, xbr", None),
+    ("*", "br"),
+    ("gzip;q=0, *", "br"),
+    ("*;q=0", None),
+    ("identity", None),
+    ("", None),
+])
+def test_elegir_codificacion(accept_encoding, esperada):
+    assert elegir_codificacion(accept_encoding, ("br", "gzip")) == esperada
+
+
+@requiere_brotli
+def test_comprime_con_brotli_si_se_acepta(cliente):
+    respuesta = _pedir(cliente, "/grande", "gzip, br")
+    assert respuesta.headers["content-encoding"] == "br"
+    assert respuesta.headers["vary"] == "Accept-Encoding"
+    assert int(respuesta.headers["content-length"]) < len(GRANDE.encode())
+    assert respuesta.text == GRANDE
+
+
+def test_br_con_q_cero_usa_gzip(cliente):
+    respuesta = _pedir(cliente, "/grande", "br;q=0, gzip")
+    assert respuesta.headers["content-encoding"] == "gzip"
+    assert respuesta.headers["vary"] == "Accept-Encoding"
+    assert respuesta.text == GRANDE
+
+
+def test_sin_brotli_instalado_usa_gzip(cliente, monkeypatch):
+    monkeypatch.setattr(respuestas, "brotli", None)
+    respuesta = _pedir(cliente, "/grande", "br, gzip")
+    assert respuesta.headers["content-encoding"] == "gzip"
+    assert respuesta.text == GRANDE
+
+
+def test_sin_codificacion_aceptable_no_comprime(cliente):
+    respuesta = _pedir(cliente, "/grande", "identity")
+    assert "content-encoding" not in respuesta.headers
+    # La respuesta depende de Accept-Encoding aunque no se haya comprimido
+    assert respuesta.headers["vary"] == "Accept-Encoding"
+    assert respuesta.text == GRANDE
+
+
+def test_respuesta_menor_al_minimo_no_se_comprime(cliente):
+    respuesta = _pedir(cliente, "/chica", "br, gzip")
+    assert "content-encoding" not in respuesta.headers
+    assert respuesta.content == b"ok"
+
+
+@requiere_brotli
+def test_brotli_decodifica_el_cuerpo(cliente):
+    with cliente.stream("GET", "/grande", headers={"Accept-Encoding": "br"}) as respuesta:
+        crudo = b"".join(respuesta.iter_raw())
+    assert respuestas.brotli.decompress(crudo).decode() == GRANDE
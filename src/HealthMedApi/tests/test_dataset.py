@@ -0,0 +1,29 @@
+import csv
+
+import pytest
+
+from src import chatbot
+
+from conftest import DATASET_PRUEBA
+
+
+def _sin_columna(tmp_path, columna):
+    with open(DATASET_PRUEBA, encoding="utf-8", newline="") as f:
+        filas = list(csv.reader(f))
+    j = filas[0].index(columna)
+    path = tmp_path / f"sin_{j}.csv"
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(fila[:j] + fila[j + 1:] for fila in filas)
+    return path
+
+
+def test_sin_tratamiento_queda_vacio(catalogo_prueba, tmp_path):
+    cat = chatbot.construir_catalogo(str(_sin_columna(tmp_path, "tratamiento")))
+    assert list(cat.tratamientos) == [""] * len(cat.nombres)
+    assert list(cat.descripciones) == list(catalogo_prueba.descripciones)
+    assert cat.symptom_cols == catalogo_prueba.symptom_cols
+
+
+def test_sin_nombre_de_enfermedad_falla_con_mensaje(tmp_path):
+    with pytest.raises(ValueError, match="nombre_de_la_enfermedad"):
+        chatbot.construir_catalogo(str(_sin_columna(tmp_path, "nombre_de_la_enfermedad")))
@@ -0,0 +1,85 @@
+from src import chatbot
+from src.chatbot import RespuestaSintoma
+from src.especulacion import especular
+
+from conftest import MUJER
+
+
+def _sesion(cat):
+    sesion = chatbot.nueva_sesion("s1", MUJER, ["fiebre", "tos"], cat)
+    chatbot.sesiones[sesion.id_sesion] = sesion
+    return sesion
+
+
+def _en_vivo(sesion):
+    copia = chatbot.copiar_sesion(sesion)
+    try:
+        return chatbot._siguiente_pregunta(copia), copia.fase
+    except ValueError as e:
+        return str(e), copia.fase
+
+
+def _responder(pregunta, respuesta):
+    chatbot.responder_pregunta("s1", RespuestaSintoma(sintoma=pregunta.sintoma, respuesta=respuesta,
+                                                      secuencia=pregunta.secuencia))
+
+
+def test_pregunta_especulada_igual_a_la_calculada(catalogo):
+    sesion = _sesion(catalogo)
+    usadas = 0
+    for paso in range(20):
+        pregunta = chatbot.siguiente_pregunta("s1")
+        especular(sesion, pregunta)
+        assert sesion._especulacion is not None
+        _responder(pregunta, paso % 3 != 1)
+        esperada, fase = _en_vivo(sesion)
+        try:
+            especulada = chatbot.pregunta_especulada(sesion)
+        except ValueError as e:
+            assert str(e) == esperada
+            break
+        assert especulada == esperada
+        assert sesion.fase == fase
+        usadas += 1
+    assert usadas >= 5
+
+
+def test_especulacion_de_una_secuencia_vieja_no_se_guarda(catalogo):
+    sesion = _sesion(catalogo)
+    pregunta = chatbot.siguiente_pregunta("s1")
+    _responder(pregunta, True)
+    especular(sesion, pregunta)
+    assert sesion._especulacion is None
+
+
+def test_especulacion_se_descarta_si_avanza_la_secuencia(catalogo):
+    sesion = _sesion(catalogo)
+    pregunta = chatbot.siguiente_pregunta("s1")
+    especular(sesion, pregunta)
+    _responder(pregunta, True)
+    # Otra respuesta antes de pedir la pregunta: la especulación ya no corresponde
+    otro = next(s for s in catalogo.symptom_cols if s not in sesion.sintomas_preguntados)
+    chatbot.responder_pregunta("s1", RespuestaSintoma(sintoma=otro, respuesta=False))
+    assert chatbot.pregunta_especulada(sesion) is None
+    assert sesion._especulacion is None
+
+
+def test_especulacion_se_descarta_si_la_respuesta_es_a_otro_sintoma(catalogo):
+    sesion = _sesion(catalogo)
+    pregunta = chatbot.siguiente_pregunta("s1")
+    especular(sesion, pregunta)
+    otro = next(s for s in catalogo.symptom_cols if s not in sesion.sintomas_preguntados and s != pregunta.sintoma)
+    chatbot.responder_pregunta("s1", RespuestaSintoma(sintoma=otro, respuesta=True))
+    assert chatbot.pregunta_especulada(sesion) is None
+
+
+def test_especulacion_se_descarta_si_cambia_el_catalogo(catalogo, otro_catalogo):
+    sesion = _sesion(catalogo)
+    pregunta = chatbot.siguiente_pregunta("s1")
+    especular(sesion, pregunta)
+    # Como al restaurar la sesión de un snapshot con otro dataset
+    sesion._catalogo = otro_catalogo
+    sesion.version_dataset = otro_catalogo.version
+    _responder(pregunta, True)
+    assert chatbot.pregunta_especulada(sesion) is None
+    assert sesion._especulacion is None
@@ -0,0 +1,172 @@
+from src import chatbot
+from src.extraccion import ExtractorSintomas, VocabularioSintomas, frases_sintomas, normalizar_texto
+
+FRASES = {
+    "dolor": "dolor",
+    "dolor de cabeza": "dolor_de_cabeza",
+    "dolor de cabeza pulsatil": "dolor_de_cabeza_pulsátil",
+    "cabeza": "cabeza",
+    "tos": "tos",
+    "tos con flema": "tos_con_flema",
+    "fiebre": "fiebre",
+    "sangrado vaginal": None,
+}
+
+VOCABULARIO = {
+    "tos": "tos",
+    "tos seca": "tos_seca",
+    "tos con flema": "tos_con_flema",
+    "flema": "tos_con_flema",
+    "tos con flema y sangre": "hemoptisis",
+    "dolor al toser": "dolor_al_toser",
+    "tostada": None,
+}
+
+
+def test_normalizar_texto():
+    assert normalizar_texto("  Visión_BORROSA, y  Náuseas! ") == "vision borrosa y nauseas"
+
+
+def test_gana_la_frase_mas_larga():
+    extractor = ExtractorSintomas(FRASES)
+    assert extractor.extraer("tengo dolor de cabeza pulsátil") == {
+        "dolor de cabeza pulsatil": "dolor_de_cabeza_pulsátil"}
+    assert extractor.extraer("tos con flema desde ayer") == {"tos con flema": "tos_con_flema"}
+
+
+def test_frases_superpuestas_con_enlaces_de_fallo():
+    # "dolor de cabeza" se reconoce saliendo de la rama "dolor de cabeza pulsatil" a medio camino
+    extractor = ExtractorSintomas(FRASES)
+    assert extractor.extraer("dolor de cabeza pulso") == {"dolor de cabeza": "dolor_de_cabeza"}
+    # Dos frases que se superponen sin contenerse: gana la que empieza primero con el mismo largo
+    solapadas = ExtractorSintomas({"a b": "ab", "b c": "bc"})
+    assert solapadas.extraer("a b c") == {"a b": "ab"}
+    assert sorted(solapadas.buscar("a b c")) == [(0, 3, "ab"), (2, 5, "bc")]
+
+
+def test_solo_palabras_completas():
+    extractor = ExtractorSintomas(FRASES)
+    assert extractor.extraer("comí una tostada") == {}
+    assert extractor.extraer("fiebres y autos") == {}
+    assert extractor.extraer("tos") == {"tos": "tos"}
+
+
+def test_acentos_y_guiones_bajos():
+    extractor = ExtractorSintomas(FRASES)
+    assert extractor.extraer("DOLOR_DE_CABEZA_PULSÁTIL") == {"dolor de cabeza pulsatil": "dolor_de_cabeza_pulsátil"}
+
+
+def test_varios_sintomas_en_una_frase():
+    extractor = ExtractorSintomas(FRASES)
+    assert extractor.extraer("Tengo fiebre, tos y me duele la cabeza") == {
+        "fiebre": "fiebre", "tos": "tos", "cabeza": "cabeza"}
+
+
+def test_frase_sin_sintoma_tapa_a_las_mas_cortas():
+    extractor = ExtractorSintomas({**FRASES, "sangrado": "sangrado"})
+    assert extractor.extraer("sangrado vaginal") == {"sangrado vaginal": None}
+
+
+def test_sinonimos():
+    columnas = ["fiebre", "dolor_de_cabeza", "tos_seca"]
+    frases = frases_sintomas(columnas, {
+        "calentura": "fiebre",  # destino que es columna
+        "jaqueca": "dolor_cabeza",  # destino que no es columna: se resuelve con difflib
+        "tos secas": "garganta_irritada",  # el destino no se parece a nada, pero el sinónimo sí
+        "comezón": "prurito",  # nada parecido: queda en None
+        "fiebre": "dolor_de_cabeza",  # escrito igual que una columna: gana la columna
+    })
+    assert frases["calentura"] == "fiebre"
+    assert frases["jaqueca"] == "dolor_de_cabeza"
+    assert frases["tos secas"] == "tos_seca"
+    assert frases["comezon"] is None
+    assert frases["fiebre"] == "fiebre"
+    assert frases["dolor de cabeza"] == "dolor_de_cabeza"
+
+
+def test_encontrar_sintomas_validos(catalogo):
+    validos, coincidencias = chatbot.encontrar_sintomas_validos(
+        ["Tengo fiebre y tos con flema", "me duele la cabeza"], cat=catalogo)
+    assert sorted(validos) == ["dolor_de_cabeza", "fiebre", "tos_con_flema"]
+    assert coincidencias["tos con flema"] == "tos_con_flema"
+
+
+def test_id_canonico_no_se_busca(catalogo, monkeypatch):
+    def falla(texto):
+        raise AssertionError("no debería buscar un id canónico")
+
+    monkeypatch.setattr(catalogo.extractor, "extraer", falla)
+    assert chatbot.encontrar_sintomas_validos(["visión_borrosa"], cat=catalogo) == (
+        ["visión_borrosa"], {"visión_borrosa": "visión_borrosa"})
+
+
+def test_difflib_cuando_el_extractor_no_cubre_el_texto(catalogo):
+    # Ninguna frase coincide con el texto mal escrito; difflib encuentra la columna
+    validos, _ = chatbot.encontrar_sintomas_validos(["sibilancia"], cat=catalogo)
+    assert validos == ["sibilancias"]
+    assert chatbot.encontrar_sintomas_validos(["nada que ver"], cat=catalogo)[0] == []
+
+
+def test_sugerir_orden():
+    vocabulario = VocabularioSintomas(VOCABULARIO, "v1")
+    # Exacta, frases que empiezan con el texto (la más corta primero) y al final una palabra interna
+    assert [s["sintoma"] for s in vocabulario.sugerir("tos")] == [
+        "tos", "tos_seca", "tos_con_flema", "hemoptisis", "dolor_al_toser"]
+    assert vocabulario.sugerir("TOSER") == [{"sintoma": "dolor_al_toser", "texto": "dolor al toser"}]
+    assert vocabulario.sugerir("") == []
+    # Las frases sin síntoma no se sugieren
+    assert vocabulario.sugerir("tost") == []
+
+
+def test_sugerir_una_vez_por_sintoma():
+    vocabulario = VocabularioSintomas(VOCABULARIO, "v1")
+    # "flema" y "tos con flema" llevan al mismo síntoma: se sugiere con la mejor de las dos
+    assert vocabulario.sugerir("flema") == [
+        {"sintoma": "tos_con_flema", "texto": "flema"},
+        {"sintoma": "hemoptisis", "texto": "tos con flema y sangre"},
+    ]
+
+
+def test_sugerir_limite():
+    vocabulario = VocabularioSintomas(VOCABULARIO, "v1")
+    assert vocabulario.sugerir("tos", limite=2) == [
+        {"sintoma": "tos", "texto": "tos"}, {"sintoma": "tos_seca", "texto": "tos seca"}]
+
+
+def test_etag_del_vocabulario():
+    etag = VocabularioSintomas(VOCABULARIO, "v1").etag
+    assert VocabularioSintomas(dict(reversed(list(VOCABULARIO.items()))), "v1").etag == etag
+    assert VocabularioSintomas(VOCABULARIO, "v2").etag != etag
+    assert VocabularioSintomas({**VOCABULARIO, "catarro": "tos"}, "v1").etag != etag
+
+
+def test_ruta_sintomas_con_if_none_match(cliente, otro_catalogo, monkeypatch):
+    respuesta = cliente.get("/sintomas")
+    assert respuesta.status_code == 200
+    etag = respuesta.headers["etag"]
+    assert etag == chatbot.catalogo.vocabulario.etag
+    assert respuesta.json()["version"] == chatbot.catalogo.version
+    assert {"sintoma": "congestión_nasal", "sinonimos": ["mucosidad", "nariz tapada"]} in respuesta.json()["sintomas"]
+
+    no_modificado = cliente.get("/sintomas", headers={"If-None-Match": f'"otro", {etag}'})
+    assert no_modificado.status_code == 304
+    assert no_modificado.content == b""
+    assert cliente.get("/sintomas", headers={"If-None-Match": '"otro"'}).status_code == 200
+
+    # Con otro catálogo el ETag cambia y el anterior ya no vale
+    monkeypatch.setattr(chatbot, "catalogo", otro_catalogo)
+    respuesta = cliente.get("/sintomas", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["etag"] != etag
+
+
+def test_ruta_sugerir_sintomas(cliente):
+    respuesta = cliente.get("/sintomas/sugerir", params={"q": "Cabeza"})
+    assert respuesta.status_code == 200
+    assert respuesta.json() == {"q": "Cabeza", "sugerencias": [
+        {"sintoma": "dolor_de_cabeza", "texto": "cabeza"},
+        {"sintoma": "dolor_de_cabeza_pulsátil", "texto": "dolor de cabeza pulsatil"},
+    ]}
+    assert len(cliente.get("/sintomas/sugerir", params={"q": "cabeza", "limite": 1}).json()["sugerencias"]) == 1
+    assert cliente.get("/sintomas/sugerir", params={"q": "cabeza", "limite": 0}).status_code == 422
+    assert cliente.get("/sintomas/sugerir", params={"q": ""}).status_code == 422
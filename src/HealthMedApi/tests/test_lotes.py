@@ -0,0 +1,57 @@
+import asyncio
+
+import numpy as np
+
+from src.lotes import MicroLotes
+
+
+def _consultar(lotes, consultas):
+    async def todas():
+        return await asyncio.gather(*(lotes.coincidencias(cat, columnas) for cat, columnas in consultas))
+    return asyncio.run(todas())
+
+
+def test_poca_carga_no_espera_un_lote(catalogo):
+    lotes = MicroLotes(espera_ms=50, max_lote=64)
+    columnas = [catalogo.indice_sintoma["fiebre"], catalogo.indice_sintoma["tos"]]
+    [resultado] = _consultar(lotes, [(catalogo, columnas)])
+    assert np.array_equal(resultado, catalogo.matriz.coincidencias(columnas))
+    assert lotes.lotes == 0 and not lotes._pendientes
+
+
+def test_lote_por_temporizador_igual_a_consultas_sueltas(catalogo, otro_catalogo):
+    lotes = MicroLotes(espera_ms=5, max_lote=64)
+    fiebre, tos = catalogo.indice_sintoma["fiebre"], catalogo.indice_sintoma["tos"]
+    consultas = [
+        (catalogo, [fiebre]),  # la primera no encuentra carga y se calcula sola
+        (catalogo, [fiebre, tos]),
+        (catalogo, [tos, fiebre, 3]),
+        (catalogo, [fiebre, tos]),  # misma consulta dos veces en el lote
+        (catalogo, [tos, tos]),  # columna repetida dentro de una consulta
+        (otro_catalogo, [fiebre, 7]),  # otro catálogo en el mismo lote
+    ]
+    resultados = _consultar(lotes, consultas)
+    for (cat, columnas), resultado in zip(consultas, resultados):
+        assert np.array_equal(resultado, cat.matriz.coincidencias(columnas))
+    # Las 5 que llegaron dentro de la ventana se resolvieron cuando venció el temporizador
+    assert lotes.lotes == 1 and lotes.consultas == 5
+    assert lotes._temporizador is None and not lotes._pendientes
+
+
+def test_lote_lleno_se_procesa_sin_esperar(catalogo):
+    lotes = MicroLotes(espera_ms=10_000, max_lote=3)
+    consultas = [(catalogo, [j, j + 1]) for j in range(4)]
+    resultados = _consultar(lotes, consultas)
+    for (cat, columnas), resultado in zip(consultas, resultados):
+        assert np.array_equal(resultado, cat.matriz.coincidencias(columnas))
+    assert lotes.lotes == 1 and lotes.consultas == 3
+    assert lotes._temporizador is None
+
+
+def test_lote_aleatorio_igual_a_consultas_sueltas(catalogo):
+    rng = np.random.default_rng(0)
+    n_cols = catalogo.matriz.forma[1]
+    consultas = [rng.integers(0, n_cols, size=rng.integers(1, 8)).tolist() for _ in range(40)]
+    resultado = catalogo.matriz.coincidencias_lote(consultas)
+    for fila, columnas in zip(resultado, consultas):
+        assert np.array_equal(fila, catalogo.matriz.coincidencias(columnas))
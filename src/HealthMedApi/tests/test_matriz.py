@@ -0,0 +1,102 @@
+import csv
+
+import numpy as np
+import pytest
+
+from src import chatbot
+from src.chatbot import calcular_scores, mejores_enfermedades, top_k
+
+from conftest import DATASET_PRUEBA
+
+CONSULTAS = [
+    ["fiebre"],
+    ["fiebre", "tos"],
+    ["dolor_de_cabeza", "mareos", "visión_borrosa"],
+    ["fatiga", "palidez", "debilidad", "mareos"],
+    ["dolor_pélvico", "sangrado_vaginal_anormal", "dolor_abdominal"],
+]
+
+
+@pytest.fixture(scope="module")
+def densa():
+    """Nombres y matriz enfermedad x síntoma leídas del CSV sin pasar por MatrizSintomas."""
+    with open(DATASET_PRUEBA, encoding="utf-8", newline="") as f:
+        filas = list(csv.reader(f))
+    columnas = filas[0]
+    sintomas = [j for j, c in enumerate(columnas) if j >= 3 and c not in chatbot.risk_cols]
+    nombres = [fila[0] for fila in filas[1:]]
+    matriz = np.array([[float(fila[j] or 0) == 1 for j in sintomas] for fila in filas[1:]])
+    return nombres, [columnas[j] for j in sintomas], matriz
+
+
+def _referencia(densa, sintomas, k, excluidas=()):
+    """Score y top k como los calculaba el código original con pandas, fila por fila."""
+    nombres, columnas, matriz = densa
+    usuario = np.isin(columnas, sintomas)
+    total_u = int(usuario.sum())
+    resultados = []
+    for i, nombre in enumerate(nombres):
+        coincidencia = int((matriz[i] & usuario).sum())
+        total_e = int(matriz[i].sum())
+        if coincidencia == 0 or nombre in excluidas:
+            continue
+        score = round(100 * (coincidencia / total_e + coincidencia / total_u) / 2, 1)
+        resultados.append((nombre, score, coincidencia))
+    resultados.sort(key=lambda r: -r[1])  # sort estable: los empates quedan en orden de fila
+    return resultados[:k]
+
+
+def test_misma_matriz_que_la_densa(catalogo, densa):
+    _, columnas, matriz = densa
+    assert catalogo.symptom_cols == columnas
+    m = catalogo.matriz
+    reconstruida = np.zeros(m.forma, dtype=bool)
+    for i in range(m.forma[0]):
+        reconstruida[i, m.fila(i)] = True
+    assert np.array_equal(reconstruida, matriz)
+    assert np.array_equal(np.unpackbits(m.bits, axis=1, count=m.forma[1]).astype(bool), matriz)
+    assert np.array_equal(m.totales, matriz.sum(axis=1))
+
+
+@pytest.mark.parametrize("sintomas", CONSULTAS)
+@pytest.mark.parametrize("k", [1, 3, 20])
+def test_scores_y_top_k_iguales_a_la_densa(catalogo, densa, sintomas, k):
+    columnas = [catalogo.indice_sintoma[s] for s in sintomas]
+    excluidas = np.zeros(catalogo.matriz.forma[0], dtype=bool)
+    filas, scores, coincidencias = mejores_enfermedades(catalogo, columnas, excluidas, k)
+    obtenido = [(catalogo.nombres[i], float(s), int(c)) for i, s, c in zip(filas, scores, coincidencias)]
+    assert obtenido == _referencia(densa, sintomas, k)
+
+
+def test_top_3_fijo(catalogo):
+    columnas = [catalogo.indice_sintoma[s] for s in ["fiebre", "tos"]]
+    filas, scores, coincidencias = mejores_enfermedades(
+        catalogo, columnas, np.zeros(catalogo.matriz.forma[0], dtype=bool), 3)
+    assert [(catalogo.nombres[i], float(s), int(c)) for i, s, c in zip(filas, scores, coincidencias)] == [
+        ("covid-19", 62.5, 2), ("asma", 35.0, 1), ("gastritis", 35.0, 1)]
+
+
+def test_top_k_excluye_enfermedades_del_otro_genero(catalogo, densa):
+    sintomas = ["dolor_pélvico", "dolor_abdominal", "fatiga"]
+    particion = catalogo.particiones[('M', 'adulto', 'normal')]
+    columnas = [catalogo.indice_sintoma[s] for s in sintomas]
+    filas, scores, _ = mejores_enfermedades(catalogo, columnas, particion.excluidas, 5)
+    excluidas = set(catalogo.nombres[particion.excluidas])
+    assert excluidas
+    assert [(catalogo.nombres[i], float(s)) for i, s in zip(filas, scores)] == \
+        [(n, s) for n, s, _ in _referencia(densa, sintomas, 5, excluidas)]
+
+
+def test_calcular_scores_casos_borde():
+    coincidencia = np.array([0, 2, 3, 1])
+    total_e = np.array([4, 4, 3, 0])
+    assert calcular_scores(coincidencia, total_e, 3).tolist() == [0.0, 58.3, 100.0, 0.0]
+    assert calcular_scores(coincidencia, total_e, 0).tolist() == [0.0, 0.0, 0.0, 0.0]
+
+
+def test_top_k_respeta_el_orden_de_los_empates():
+    scores = np.array([50.0, 75.0, 50.0, 75.0, 10.0, 50.0])
+    assert top_k(scores, 3).tolist() == [1, 3, 0]
+    assert top_k(scores, 4).tolist() == [1, 3, 0, 2]
+    assert top_k(scores, 10).tolist() == [1, 3, 0, 2, 5, 4]
+    assert top_k(scores, 0).tolist() == []
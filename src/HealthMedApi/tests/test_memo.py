@@ -0,0 +1,70 @@
+from src import chatbot
+from src.chatbot import DatosUsuario, RespuestaSintoma
+from src.memo import MemoCompartida, clave_estado
+
+from conftest import HOMBRE, MUJER
+
+
+def _sesion(cat, datos, respuestas):
+    sesion = chatbot.nueva_sesion("s", datos, ["fiebre", "tos"], cat)
+    for sintoma, respuesta in respuestas:
+        chatbot._registrar_respuesta(sesion, RespuestaSintoma(sintoma=sintoma, respuesta=respuesta))
+    return sesion
+
+
+RESPUESTAS = [("fatiga", True), ("mareos", False), ("dolor_de_cabeza", True), ("sibilancias", False)]
+
+
+def test_mismo_estado_en_otro_orden_da_la_misma_clave(catalogo):
+    a = _sesion(catalogo, MUJER, RESPUESTAS)
+    b = _sesion(catalogo, MUJER, RESPUESTAS[::-1])
+    assert chatbot.clave_siguiente(a) == chatbot.clave_siguiente(b)
+    assert chatbot.clave_diagnostico(a, 3) == chatbot.clave_diagnostico(b, 3)
+
+
+def test_edad_e_imc_no_cambian_la_clave(catalogo):
+    mayor = DatosUsuario(edad=70, genero='F', peso=95, altura=1.6, sintomas=[])
+    a = _sesion(catalogo, MUJER, RESPUESTAS)
+    b = _sesion(catalogo, mayor, RESPUESTAS)
+    assert chatbot.clave_siguiente(a) == chatbot.clave_siguiente(b)
+    assert chatbot.clave_diagnostico(a, 3) == chatbot.clave_diagnostico(b, 3)
+
+
+def test_otro_estado_da_otra_clave(catalogo, otro_catalogo):
+    base = _sesion(catalogo, MUJER, RESPUESTAS)
+    distintas = [
+        _sesion(catalogo, HOMBRE, RESPUESTAS),  # otro género
+        _sesion(otro_catalogo, MUJER, RESPUESTAS),  # otra versión del dataset
+        _sesion(catalogo, MUJER, RESPUESTAS[:-1] + [("sibilancias", True)]),  # otra respuesta
+    ]
+    for otra in distintas:
+        assert chatbot.clave_siguiente(otra) != chatbot.clave_siguiente(base)
+        assert chatbot.clave_diagnostico(otra, 3) != chatbot.clave_diagnostico(base, 3)
+    assert chatbot.clave_diagnostico(base, 5) != chatbot.clave_diagnostico(base, 3)
+    # Un "no" no cambia el top k, pero sí la siguiente pregunta
+    menos = _sesion(catalogo, MUJER, RESPUESTAS[:-1])
+    assert chatbot.clave_siguiente(menos) != chatbot.clave_siguiente(base)
+
+
+def test_clave_estado_separa_las_partes():
+    assert clave_estado("ab", "c") != clave_estado("a", "bc")
+    assert clave_estado(1, b"x") == clave_estado("1", b"x")
+
+
+def test_memo_respeta_el_limite_lru():
+    memo = MemoCompartida(max_entradas=2)
+    memo.guardar("a", 1)
+    memo.guardar("b", 2)
+    assert memo.obtener("a") == 1  # "b" pasa a ser la menos usada
+    memo.guardar("c", 3)
+    assert not memo.contiene("b")
+    assert memo.obtener("a") == 1 and memo.obtener("c") == 3
+    assert memo.metricas()["entradas"] == 2
+    assert memo.metricas()["desalojos"] == 1
+
+
+def test_memo_desactivada():
+    memo = MemoCompartida(max_entradas=0)
+    memo.guardar("a", 1)
+    assert memo.obtener("a") is None
+    assert memo.metricas()["entradas"] == 0
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from src import chatbot, recarga
+from src.arbol import aperturas_frecuentes, compilar_arbol, guardar_arbol
+
+from conftest import DATASET_PRUEBA, MUJER
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """Copia del dataset de prueba que los tests pueden modificar."""
+    path = tmp_path / "dataset.csv"
+    path.write_bytes(DATASET_PRUEBA.read_bytes())
+    return path
+
+
+def _modificar(path, segundos=10):
+    path.write_bytes(path.read_bytes() + b"\n")
+    mtime = path.stat().st_mtime + segundos
+    os.utime(path, (mtime, mtime))
+
+
+def test_recarga_publica_otro_catalogo_y_las_sesiones_conservan_el_suyo(catalogo, dataset, tmp_path):
+    sesion = chatbot.nueva_sesion("s1", MUJER, ["fiebre", "tos"], catalogo)
+    _modificar(dataset)
+    nuevo = asyncio.run(recarga.recargar_dataset(dataset, tmp_path / "sin_arbol.npz"))
+
+    assert chatbot.catalogo is nuevo and nuevo.version != catalogo.version
+    assert chatbot.catalogo_de(sesion) is catalogo
+    assert sesion.version_dataset == catalogo.version
+    chatbot.calcular_siguiente(sesion)
+
+
+def test_el_catalogo_vigente_no_cambia_hasta_terminar(catalogo, dataset, tmp_path, monkeypatch):
+    construir = chatbot.construir_catalogo
+    empezo, seguir = threading.Event(), threading.Event()
+    vistos = []
+
+    def lento(path):
+        empezo.set()
+        seguir.wait(5)
+        return construir(path)
+
+    monkeypatch.setattr(chatbot, "construir_catalogo", lento)
+
+    async def escenario():
+        tarea = asyncio.create_task(recarga.recargar_dataset(dataset, tmp_path / "sin_arbol.npz"))
+        while not empezo.is_set():
+            await asyncio.sleep(0.001)
+        # Mientras se construye, el event loop atiende y ve el catálogo anterior completo
+        vistos.append(chatbot.catalogo)
+        seguir.set()
+        return await tarea
+
+    nuevo = asyncio.run(escenario())
+    assert vistos == [catalogo]
+    assert chatbot.catalogo is nuevo
+
+
+def test_recargas_concurrentes_se_serializan(catalogo, dataset, tmp_path, monkeypatch):
+    construir = chatbot.construir_catalogo
+    en_curso, maximo = [0], [0]
+    lock = threading.Lock()
+
+    def contado(path):
+        with lock:
+            en_curso[0] += 1
+            maximo[0] = max(maximo[0], en_curso[0])
+        time.sleep(0.05)
+        try:
+            return construir(path)
+        finally:
+            with lock:
+                en_curso[0] -= 1
+
+    monkeypatch.setattr(chatbot, "construir_catalogo", contado)
+    monkeypatch.setattr(recarga, "_lock_recarga", asyncio.Lock())
+
+    async def escenario():
+        return await asyncio.gather(*(recarga.recargar_dataset(dataset, tmp_path / "sin_arbol.npz")
+                                      for _ in range(3)))
+
+    resultados = asyncio.run(escenario())
+    assert maximo[0] == 1
+    assert chatbot.catalogo is resultados[-1]
+
+
+def test_recarga_carga_o_descarta_el_arbol(catalogo, dataset, tmp_path, monkeypatch):
+    viejo = compilar_arbol(catalogo, aperturas_frecuentes(catalogo, 2), profundidad=3, min_pacientes=1)
+    monkeypatch.setattr(chatbot, "arbol_preguntas", viejo)
+    ruta_arbol = tmp_path / "arbol.npz"
+
+    # Sin árbol para la versión nueva: se descarta el anterior
+    _modificar(dataset)
+    nuevo = asyncio.run(recarga.recargar_dataset(dataset, ruta_arbol))
+    assert chatbot.arbol_preguntas is None
+
+    # Con un árbol compilado para la versión nueva: se publica
+    guardar_arbol(compilar_arbol(nuevo, aperturas_frecuentes(nuevo, 2), profundidad=3, min_pacientes=1),
+                  ruta_arbol)
+    asyncio.run(recarga.recargar_dataset(dataset, ruta_arbol))
+    assert chatbot.arbol_preguntas is not None
+    assert chatbot.arbol_preguntas.version == chatbot.catalogo.version == nuevo.version
+
+
+def test_vigilante_recarga_al_cambiar_y_sobrevive_a_un_error(catalogo, dataset, tmp_path, monkeypatch):
+    construir = chatbot.construir_catalogo
+    fallar = [False]
+    llamadas = []
+
+    def controlado(path):
+        llamadas.append(fallar[0])
+        if fallar[0]:
+            raise ValueError("dataset inválido")
+        return construir(path)
+
+    monkeypatch.setattr(chatbot, "construir_catalogo", controlado)
+
+    async def esperar(n):
+        for _ in range(500):
+            if len(llamadas) >= n:
+                return
+            await asyncio.sleep(0.005)
+        raise AssertionError("el vigilante no recargó")
+
+    async def escenario():
+        vigilante = asyncio.create_task(recarga.vigilar_dataset(lambda: dataset, intervalo=0.01))
+        await asyncio.sleep(0.05)
+        assert llamadas == []  # la primera revisión sólo registra la fecha
+
+        fallar[0] = True
+        _modificar(dataset, 10)
+        await esperar(1)
+        fallar[0] = False
+        _modificar(dataset, 20)
+        await esperar(2)
+        await asyncio.sleep(0.02)
+        assert not vigilante.done()
+        vigilante.cancel()
+
+    asyncio.run(escenario())
+    assert llamadas == [True, False]
+    assert chatbot.catalogo is not catalogo
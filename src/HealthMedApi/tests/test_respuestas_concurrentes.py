@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from src import chatbot
+from src.chatbot import RespuestaSintoma
+
+from conftest import MUJER
+
+
+@pytest.fixture
+def sesion(catalogo):
+    sesion = chatbot.nueva_sesion("s1", MUJER, ["fiebre", "tos"], catalogo)
+    chatbot.sesiones[sesion.id_sesion] = sesion
+    return sesion
+
+
+def test_la_misma_respuesta_dos_veces_no_se_cuenta_dos_veces(sesion):
+    respuesta = RespuestaSintoma(sintoma="fatiga", respuesta=True, secuencia=0)
+    assert chatbot.responder_pregunta("s1", respuesta)["mensaje"] == "Respuesta registrada"
+    estado = sesion.model_dump()
+    historial = list(sesion._historial)
+    assert chatbot.responder_pregunta("s1", respuesta) == {
+        "status": "success", "mensaje": "Respuesta ya registrada", "secuencia": 1}
+    # Sin secuencia, el mismo síntoma y valor también se reconoce como reintento
+    assert chatbot.responder_pregunta("s1", RespuestaSintoma(sintoma="fatiga", respuesta=True))["secuencia"] == 1
+    assert sesion.model_dump() == estado
+    assert list(sesion._historial) == historial
+
+
+def test_secuencia_desactualizada(sesion):
+    chatbot.responder_pregunta("s1", RespuestaSintoma(sintoma="fatiga", respuesta=True, secuencia=0))
+    chatbot.responder_pregunta("s1", RespuestaSintoma(sintoma="mareos", respuesta=False, secuencia=1))
+    with pytest.raises(ValueError, match="Secuencia de respuesta desactualizada"):
+        chatbot.responder_pregunta("s1", RespuestaSintoma(sintoma="palidez", respuesta=True, secuencia=0))
+    # Un valor distinto para la última pregunta con su secuencia vieja no es un reintento
+    with pytest.raises(ValueError, match="Secuencia de respuesta desactualizada"):
+        chatbot.responder_pregunta("s1", RespuestaSintoma(sintoma="mareos", respuesta=True, secuencia=1))
+    assert sesion.secuencia == 2
+    assert sesion.sintomas_confirmados["mareos"] == 0
+
+
+def test_secuencia_desactualizada_responde_409(cliente, sesion):
+    url = "/responder-pregunta/s1"
+    assert cliente.post(url, json={"sintoma": "fatiga", "respuesta": True, "secuencia": 0}).status_code == 200
+    repetida = cliente.post(url, json={"sintoma": "fatiga", "respuesta": True, "secuencia": 0})
+    assert repetida.status_code == 200 and repetida.json()["mensaje"] == "Respuesta ya registrada"
+    vieja = cliente.post(url, json={"sintoma": "palidez", "respuesta": True, "secuencia": 0})
+    assert vieja.status_code == 409
+    assert cliente.post("/responder-pregunta/otra", json={"sintoma": "tos", "respuesta": True}).status_code == 404
+
+
+def _en_hilos(n, funcion):
+    barrera = threading.Barrier(n)
+    resultados = [None] * n
+
+    def correr(i):
+        barrera.wait()
+        try:
+            resultados[i] = funcion(i)
+        except ValueError as e:
+            resultados[i] = e
+
+    hilos = [threading.Thread(target=correr, args=(i,)) for i in range(n)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+
+def test_respuestas_simultaneas_con_la_misma_secuencia(sesion, catalogo):
+    sintomas = [s for s in catalogo.symptom_cols if s not in sesion.sintomas_preguntados][:8]
+    preguntas = sesion.preguntas_realizadas
+
+    resultados = _en_hilos(len(sintomas), lambda i: chatbot.responder_pregunta(
+        "s1", RespuestaSintoma(sintoma=sintomas[i], respuesta=True, secuencia=0)))
+
+    aceptadas = [i for i, r in enumerate(resultados) if isinstance(r, dict)]
+    assert len(aceptadas) == 1
+    assert all(str(r) == "Secuencia de respuesta desactualizada" for r in resultados if isinstance(r, ValueError))
+    assert sesion.secuencia == 1
+    assert sesion.preguntas_realizadas == preguntas + 1
+    assert [s for s in sintomas if sesion.sintomas_confirmados[s] == 1] == [sintomas[aceptadas[0]]]
+    assert len(sesion._historial) == 1
+
+
+def test_reintentos_simultaneos_se_cuentan_una_vez(sesion):
+    preguntas = sesion.preguntas_realizadas
+    resultados = _en_hilos(8, lambda i: chatbot.responder_pregunta(
+        "s1", RespuestaSintoma(sintoma="fatiga", respuesta=True)))
+    assert [r["mensaje"] for r in resultados].count("Respuesta registrada") == 1
+    assert sesion.secuencia == 1
+    assert sesion.preguntas_realizadas == preguntas + 1
@@ -0,0 +1,53 @@
+from src import chatbot, snapshot
+from src.chatbot import RespuestaSintoma
+
+from conftest import MUJER
+
+
+def _sesion_respondida(cat):
+    sesion = chatbot.nueva_sesion("s1", MUJER, ["fiebre", "tos"], cat)
+    chatbot.sesiones[sesion.id_sesion] = sesion
+    pregunta = chatbot.siguiente_pregunta("s1")
+    chatbot.responder_pregunta("s1", RespuestaSintoma(sintoma=pregunta.sintoma, respuesta=True,
+                                                      secuencia=pregunta.secuencia))
+    return sesion, pregunta
+
+
+def test_guardar_y_restaurar(catalogo, tmp_path):
+    original, pregunta = _sesion_respondida(catalogo)
+    snapshot.guardar_snapshot(tmp_path)
+    chatbot.sesiones.clear()
+
+    assert snapshot.restaurar_snapshot(tmp_path) == 1
+    restaurada = chatbot.sesiones["s1"]
+    assert restaurada.model_dump() == original.model_dump()
+    assert list(restaurada._historial) == list(original._historial)
+    # Un reintento de la última respuesta justo después del reinicio no se vuelve a contar
+    reintento = RespuestaSintoma(sintoma=pregunta.sintoma, respuesta=True, secuencia=pregunta.secuencia)
+    assert chatbot.responder_pregunta("s1", reintento)["mensaje"] == "Respuesta ya registrada"
+    assert restaurada.secuencia == original.secuencia
+    esperada = chatbot.calcular_siguiente(chatbot.copiar_sesion(original))
+    assert chatbot.siguiente_pregunta("s1").sintoma == esperada.sintoma
+
+
+def test_sin_snapshot(catalogo, tmp_path):
+    assert snapshot.restaurar_snapshot(tmp_path) == 0
+    assert not chatbot.sesiones
+
+
+def test_snapshot_corrupto_se_aparta(catalogo, tmp_path):
+    _sesion_respondida(catalogo)
+    destino = snapshot.guardar_snapshot(tmp_path)
+    chatbot.sesiones.clear()
+    destino.write_bytes(destino.read_bytes()[:-20])
+
+    assert snapshot.restaurar_snapshot(tmp_path) == 0
+    assert not chatbot.sesiones
+    assert not destino.exists()
+    assert len(list(tmp_path.glob(snapshot.ARCHIVO + ".corrupto-*"))) == 1
+
+
+def test_snapshot_con_formato_desconocido(catalogo, tmp_path):
+    (tmp_path / snapshot.ARCHIVO).write_bytes(b"no es un snapshot")
+    assert snapshot.restaurar_snapshot(tmp_path) == 0
+    assert len(list(tmp_path.glob(snapshot.ARCHIVO + ".corrupto-*"))) == 1